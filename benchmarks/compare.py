@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Compares two result files of benchmarks/run.py, workload by workload.
+
+Exits with status 1 when the throughput of a workload dropped, or its p50
+latency rose, by more than the threshold (10% by default), so that it can gate
+a change in CI:
+
+    python benchmarks/compare.py before.json after.json --threshold 0.2
+"""
+import sys
+import json
+import argparse
+
+# Metrics compared, and whether a higher value is better.
+METRICS = [
+    ('calls_per_sec', True),
+    ('p50_ms', False),
+    ('p99_ms', False),
+    ('rss_mb', False),
+]
+
+# Private module methods.
+def _change(before, after):
+    if before in [None, 0] or after is None:
+        return None
+    return after / before - 1
+
+def _format(change):
+    return '' if change is None else '{:+.1%}'.format(change)
+
+def main():
+    parser = argparse.ArgumentParser(description='Compares two benchmark result files.')
+    parser.add_argument('before', help='the baseline results.')
+    parser.add_argument('after', help='the results to compare to the baseline.')
+    parser.add_argument('--threshold', default=0.1, type=float, help='(optional, defaults to 0.1): the relative change of throughput or p50 latency reported as a regression.')
+    args = parser.parse_args()
+
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+
+    print('{} ({}) -> {} ({})'.format(
+        before['version'], before['date'], after['version'], after['date']))
+    for name in ['import', 'first_call']:
+        old, new = before['startup'][name]['p50_ms'], after['startup'][name]['p50_ms']
+        print('{:<24} {:>10} ms -> {:>10} ms {:>8}'.format(name, old, new, _format(_change(old, new))))
+
+    regressions = []
+    header = ''.join('{:>28}'.format(x) for x, _ in METRICS)
+    print('\n{:<24}{}'.format('workload', header))
+    for name, new in after['workloads'].items():
+        old = before['workloads'].get(name)
+        if old is None:
+            continue
+        columns = []
+        for metric, higher_is_better in METRICS:
+            change = _change(old[metric], new[metric])
+            columns.append('{:>28}'.format('{} -> {} {}'.format(old[metric], new[metric], _format(change))))
+            if change is not None and metric in ['calls_per_sec', 'p50_ms']:
+                if (-change if higher_is_better else change) > args.threshold:
+                    regressions.append('{} {} {}'.format(name, metric, _format(change)))
+        print('{:<24}{}'.format(name, ''.join(columns)))
+
+    if regressions:
+        print('\nRegressions over {:.0%}:'.format(args.threshold))
+        for regression in regressions:
+            print('  ' + regression)
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Offline benchmarks of the scraper, run against the stub Node module in
+benchmarks/stub instead of the Play Store.
+
+Measures import time, cold start, and the throughput, latency percentiles and
+memory of every public function and of batch workloads. Results are written as
+JSON, to be compared across versions with benchmarks/compare.py:
+
+    python benchmarks/run.py --output before.json
+    python benchmarks/run.py --output after.json
+    python benchmarks/compare.py before.json after.json
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import itertools
+import datetime
+import platform
+import resource
+import statistics
+import subprocess
+import tempfile
+import concurrent.futures
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+STUB_DIR = os.path.join(BENCH_DIR, 'stub', 'google-play-scraper')
+
+# Private module methods.
+def _get_env(latency):
+    # The stub module and a throwaway cache directory, for this process and its children.
+    env = dict(os.environ)
+    env['SCRAPER_NODE_DIR'] = STUB_DIR
+    env['BENCH_LATENCY_MS'] = str(latency)
+    env['XDG_CACHE_HOME'] = tempfile.mkdtemp(prefix='scraper-bench-')
+    env['PYTHONPATH'] = os.pathsep.join([ROOT_DIR] + [x for x in [env.get('PYTHONPATH')] if x])
+    return env
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+def _rss(pid='self'):
+    # Resident set size in MiB, read from /proc (Linux only).
+    try:
+        with open('/proc/{}/status'.format(pid)) as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    if pid == 'self':
+        # Peak rather than current RSS; kilobytes on Linux, bytes on macOS.
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(peak / (2 ** 20 if sys.platform == 'darwin' else 1024), 1)
+    return None
+
+def _worker_rss():
+    import scraper.wrapper
+    pids = [x._process.pid for x in scraper.wrapper._wrapper.pool.workers if x._process is not None]
+    values = [_rss(x) for x in pids]
+    return None if None in values or not values else round(sum(values), 1)
+
+def _time_subprocess(code, env, repeat):
+    # Median over fresh interpreters, so that nothing is already imported.
+    times = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, '-c', code], env=env, check=True,
+            capture_output=True, text=True).stdout
+        times.append(float(output.strip().splitlines()[-1]))
+    return {
+        'p50_ms': round(statistics.median(times) * 1000, 2),
+        'min_ms': round(min(times) * 1000, 2),
+        'runs': repeat,
+    }
+
+def _measure_import(env, repeat):
+    import_code = (
+        'import time; start = time.perf_counter(); import scraper; '
+        'print(time.perf_counter() - start)')
+    first_call_code = (
+        'import time; start = time.perf_counter(); import scraper; '
+        'scraper.app("com.example"); print(time.perf_counter() - start)')
+    return {
+        'import': _time_subprocess(import_code, env, repeat),
+        'first_call': _time_subprocess(first_call_code, env, repeat),
+    }
+
+def _measure(fn, calls, concurrency=1):
+    # Calls fn `calls` times, from `concurrency` threads, timing every call.
+    fn()
+    latencies = []
+    def timed(_):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    if concurrency == 1:
+        for i in range(calls):
+            timed(i)
+    else:
+        with concurrent.futures.ThreadPoolExecutor(concurrency) as executor:
+            list(executor.map(timed, range(calls)))
+    return _summarize(calls, time.perf_counter() - start, latencies)
+
+def _measure_total(fn):
+    # For workloads that only report how many records they went through.
+    start = time.perf_counter()
+    count = fn()
+    return _summarize(count, time.perf_counter() - start, None)
+
+def _summarize(calls, seconds, latencies, workers=True):
+    result = {
+        'calls': calls,
+        'seconds': round(seconds, 4),
+        'calls_per_sec': round(calls / seconds, 1) if seconds else None,
+        'p50_ms': None,
+        'p99_ms': None,
+    }
+    if latencies:
+        result['p50_ms'] = round(_percentile(latencies, 0.5) * 1000, 3)
+        result['p99_ms'] = round(_percentile(latencies, 0.99) * 1000, 3)
+    result['rss_mb'] = _rss()
+    result['worker_rss_mb'] = _worker_rss() if workers else None
+    return result
+
+def _count_batch(command, rows, concurrency, **kwargs):
+    import scraper
+    return sum(1 for _ in scraper.batch(command, rows, concurrency, ordered=False, **kwargs))
+
+def _measure_aio(calls, concurrency):
+    import scraper.aio
+
+    async def run():
+        # The pool of the event loop is started before the clock.
+        scraper.aio.configure(concurrency=concurrency)
+        await scraper.aio.app('com.example')
+        start = time.perf_counter()
+        try:
+            await asyncio.gather(*[
+                scraper.aio.app('com.example.{}'.format(i)) for i in range(calls)])
+            return time.perf_counter() - start
+        finally:
+            await scraper.aio.close()
+    # The workers of the asyncio pool are stopped by then, so only Python's RSS is reported.
+    return _summarize(calls, asyncio.run(run()), None, workers=False)
+
+def _get_workloads(calls):
+    import scraper
+
+    fields = ['appId', 'score', 'installs', 'updated', 'version']
+    sequential = {
+        'app': lambda: scraper.app('com.example'),
+        'app_fields': lambda: scraper.app('com.example', fields=fields),
+        'app_objects': lambda: scraper.app('com.example', as_objects=True),
+        'app_memo_hit': lambda: scraper.app('com.example', memo=True),
+        'app_cache_hit': lambda: scraper.app('com.example', cache=True),
+        'list': lambda: scraper.list(num=100),
+        'list_full_detail': lambda: scraper.list(num=100, fullDetail=True),
+        'search': lambda: scraper.search('example'),
+        'developer': lambda: scraper.developer('Example'),
+        'suggest': lambda: scraper.suggest('example'),
+        'reviews': lambda: scraper.reviews('com.example', num=150),
+        'similar': lambda: scraper.similar('com.example'),
+        'permissions': lambda: scraper.permissions('com.example'),
+        'datasafety': lambda: scraper.datasafety('com.example'),
+        'categories': lambda: scraper.categories(),
+    }
+    workloads = {k: (lambda fn=v: _measure(fn, calls)) for k, v in sequential.items()}
+
+    # Concurrent calls use distinct ids, as identical calls in flight are coalesced.
+    counter = itertools.count()
+    ids = [{'appId': 'com.example.{}'.format(i)} for i in range(calls * 5)]
+    workloads['app_threads_50'] = lambda: _measure(
+        lambda: scraper.app('com.example.{}'.format(next(counter))), calls * 5, 50)
+    workloads['batch_app'] = lambda: _measure_total(lambda: _count_batch('app', ids, 50))
+    workloads['batch_app_4_workers'] = lambda: _with_workers(
+        4, lambda: _measure_total(lambda: _count_batch('app', ids, 50)))
+    workloads['aio_app'] = lambda: _measure_aio(calls * 5, 50)
+    workloads['iter_reviews'] = lambda: _measure_total(
+        lambda: sum(1 for _ in scraper.iter_reviews('com.example', max_reviews=5000)))
+    return workloads
+
+def _with_workers(workers, fn):
+    import scraper
+    scraper.configure(workers=workers)
+    # Start every worker before the clock.
+    _count_batch('app', [{'appId': 'com.example.{}'.format(i)} for i in range(workers * 20)], workers * 20)
+    try:
+        return fn()
+    finally:
+        scraper.configure(workers=1)
+
+def main():
+    parser = argparse.ArgumentParser(description='Runs the offline benchmarks of the scraper.')
+    parser.add_argument('--output', '-o', help='(optional, defaults to STDOUT): the file the JSON results are written to.')
+    parser.add_argument('--calls', default=200, type=int, help='(optional, defaults to 200): the number of calls per sequential workload; concurrent workloads make five times as many.')
+    parser.add_argument('--latency', default=0, type=int, help='(optional, defaults to 0): milliseconds the stub module waits before answering each call.')
+    parser.add_argument('--repeat', default=5, type=int, help='(optional, defaults to 5): the number of fresh interpreters import time is measured in.')
+    parser.add_argument('--only', type=lambda x: x.split(','), help='(optional, defaults to all): comma separated workloads to run.')
+    args = parser.parse_args()
+
+    # Applied before the scraper is first imported, as its paths are read at import time.
+    env = _get_env(args.latency)
+    os.environ.update(env)
+    sys.path.insert(0, ROOT_DIR)
+
+    results = {
+        'version': None,
+        'python': platform.python_version(),
+        'node': subprocess.run(['node', '--version'], capture_output=True, text=True).stdout.strip(),
+        'platform': platform.platform(),
+        'date': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'settings': {'calls': args.calls, 'latency_ms': args.latency},
+        'startup': _measure_import(env, args.repeat),
+        'workloads': {},
+    }
+
+    import scraper
+    import scraper.decoder
+    results['version'] = scraper.__version__
+    results['decoder'] = scraper.decoder.BACKEND
+
+    workloads = _get_workloads(args.calls)
+    for name in args.only or workloads:
+        print('Running {}...'.format(name), file=sys.stderr)
+        results['workloads'][name] = workloads[name]()
+
+    output = json.dumps(results, indent=2)
+    if args.output is None:
+        print(output)
+    else:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+// Offline stand-in for the google-play-scraper module, used by the benchmarks.
+// Records have the shape and rough size of real Play Store responses, and every
+// call resolves after BENCH_LATENCY_MS milliseconds (default 0, to measure the
+// overhead of the Python wrapper alone).
+
+const latency = parseInt(process.env.BENCH_LATENCY_MS || '0', 10);
+const reviewCount = parseInt(process.env.BENCH_REVIEW_COUNT || '5000', 10);
+
+const delay = () => new Promise((resolve) => setTimeout(resolve, latency));
+
+const constants = {
+  collection: { TOP_FREE: 'TOP_FREE', TOP_PAID: 'TOP_PAID', GROSSING: 'GROSSING' },
+  category: { APPLICATION: 'APPLICATION', GAME: 'GAME', TOOLS: 'TOOLS', FAMILY: 'FAMILY' },
+  age: { FIVE_UNDER: 'AGE_RANGE1', SIX_EIGHT: 'AGE_RANGE2', NINE_UP: 'AGE_RANGE3' },
+  sort: { HELPFULNESS: 1, NEWEST: 2, RATING: 3 }
+};
+
+const paragraph = 'Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor incididunt ut labore et dolore magna aliqua. ';
+
+function summary (appId) {
+  return {
+    appId: appId,
+    title: 'Application ' + appId,
+    url: 'https://play.google.com/store/apps/details?id=' + appId,
+    icon: 'https://play-lh.googleusercontent.com/' + appId,
+    developer: 'Developer of ' + appId,
+    developerId: 'dev.' + appId,
+    currency: 'USD',
+    price: 0,
+    free: true,
+    summary: paragraph,
+    scoreText: '4.1',
+    score: 4.1
+  };
+}
+
+function detail (appId) {
+  const screenshots = [];
+  for (let i = 0; i < 20; i++) {
+    screenshots.push('https://play-lh.googleusercontent.com/' + appId + '/screenshot/' + i);
+  }
+  return Object.assign(summary(appId), {
+    description: paragraph.repeat(30),
+    descriptionHTML: ('<p>' + paragraph + '</p>').repeat(30),
+    installs: '1,000,000+',
+    minInstalls: 1000000,
+    maxInstalls: 3456789,
+    ratings: 12345,
+    reviews: 2345,
+    histogram: { 1: 100, 2: 200, 3: 300, 4: 400, 5: 500 },
+    priceText: 'Free',
+    available: true,
+    offersIAP: true,
+    IAPRange: '$0.99 - $99.99',
+    androidVersion: '7.0',
+    androidVersionText: '7.0 and up',
+    developerEmail: 'contact@example.com',
+    developerWebsite: 'https://example.com',
+    developerAddress: '1 Infinite Loop',
+    privacyPolicy: 'https://example.com/privacy',
+    genre: 'Tools',
+    genreId: 'TOOLS',
+    headerImage: 'https://play-lh.googleusercontent.com/' + appId + '/header',
+    screenshots: screenshots,
+    contentRating: 'Everyone',
+    adSupported: false,
+    released: 'Jan 1, 2020',
+    updated: 1616099487000,
+    version: '1.2.3',
+    recentChanges: paragraph,
+    comments: [paragraph, paragraph, paragraph]
+  });
+}
+
+function review (k) {
+  return {
+    id: 'gp:review.' + k,
+    userName: 'User ' + k,
+    userImage: 'https://play-lh.googleusercontent.com/user/' + k,
+    date: new Date(Date.UTC(2026, 0, 1) - k * 60000).toISOString(),
+    score: 1 + (k % 5),
+    scoreText: String(1 + (k % 5)),
+    url: 'https://play.google.com/store/apps/details?id=app&reviewId=' + k,
+    title: null,
+    text: paragraph,
+    replyDate: null,
+    replyText: null,
+    version: '1.2.3',
+    thumbsUp: k % 17,
+    criterias: []
+  };
+}
+
+function apps (prefix, num, fullDetail) {
+  const result = [];
+  for (let i = 0; i < num; i++) {
+    result.push((fullDetail ? detail : summary)(prefix + '.' + i));
+  }
+  return result;
+}
+
+const api = {
+  app: async (o) => { await delay(); return detail(o.appId); },
+  list: async (o) => { await delay(); return apps('list', o.num || 500, o.fullDetail); },
+  search: async (o) => { await delay(); return apps('search', o.num || 20, o.fullDetail); },
+  developer: async (o) => { await delay(); return apps('developer', o.num || 60, o.fullDetail); },
+  suggest: async (o) => { await delay(); return [1, 2, 3, 4, 5].map((i) => o.term + ' ' + i); },
+  similar: async (o) => { await delay(); return apps('similar', 50, o.fullDetail); },
+  permissions: async (o) => {
+    await delay();
+    const result = [];
+    for (let i = 0; i < 30; i++) {
+      result.push({ permission: 'permission ' + i, type: 'Type ' + (i % 5) });
+    }
+    return o.short ? result.map((x) => x.permission) : result;
+  },
+  datasafety: async () => {
+    await delay();
+    const data = [];
+    for (let i = 0; i < 10; i++) {
+      data.push({ data: 'Data ' + i, optional: i % 2 === 0, purpose: 'Analytics', type: 'Type ' + i });
+    }
+    return {
+      sharedData: data,
+      collectedData: data,
+      securityPractices: [{ practice: 'Data is encrypted in transit', description: paragraph }],
+      privacyPolicyUrl: 'https://example.com/privacy'
+    };
+  },
+  categories: async () => { await delay(); return Object.keys(constants.category); },
+  reviews: async (o) => {
+    await delay();
+    const start = o.nextPaginationToken ? parseInt(o.nextPaginationToken, 10) : 0;
+    const num = o.paginate ? 150 : (o.num || 100);
+    const data = [];
+    for (let k = start; k < start + num && k < reviewCount; k++) {
+      data.push(review(k));
+    }
+    const next = start + data.length;
+    return { data: data, nextPaginationToken: o.paginate && next < reviewCount ? String(next) : null };
+  }
+};
+
+module.exports = Object.assign({}, constants, api, { memoized: () => module.exports });
@@ -1,4 +1,8 @@
 from .scraper import *
 
+# Constant enums (collection, category, age and sort), loaded on first access.
+def __getattr__(name):
+    return getattr(scraper, name)
+
 # Version of the google-play-scraper-py package.
 __version__ = "0.3.1"
@@ -4,10 +4,30 @@ import sys
 import json
 import logging
 import argparse
+import tempfile
+import itertools
 import scraper.scraper
+import scraper.output
+import scraper.crawl
+import scraper.coordinator
+import scraper.server
 
 logger = logging.getLogger(__name__)
 
+MODULE_COMMANDS = ['update-modules', 'check-modules']
+
+# Parameter filled by each plain line of a batch input file.
+BATCH_KEYS = {
+    'app': 'appId',
+    'datasafety': 'appId',
+    'permissions': 'appId',
+    'reviews': 'appId',
+    'similar': 'appId',
+    'developer': 'devId',
+    'search': 'term',
+    'suggest': 'term',
+}
+
 def _setup_logger():
     filename = 'output.log'
     datefmt = '%Y-%m-%d %H:%M:%S'
@@ -18,7 +38,8 @@ def _setup_logger():
     file_handler.setFormatter(formatter)
     logger.addHandler(file_handler)
 
-    stdout_handler = logging.StreamHandler(sys.stdout)
+    # Log to STDERR so that results written to STDOUT can be piped.
+    stdout_handler = logging.StreamHandler(sys.stderr)
     stdout_handler.setFormatter(formatter)
     logger.addHandler(stdout_handler)
     logger.setLevel(logging.INFO)
@@ -90,14 +111,83 @@ def _setup_parsers():
     subparsers['permissions'].add_argument('--lang',  help='(optional, defaults to \'en\'): the two letter language code in which to fetch the permissions.')
     subparsers['permissions'].add_argument('--short', action='store_true', help='(optional, defaults to false): if true, the permission names will be returned instead of permission/description objects.')
 
+    # Create the parser for the 'batch' command.
+    subparsers['batch'] = handle.add_parser('batch', help='Runs a command for every application id (or parameter row) of a file, concurrently.')
+    subparsers['batch'].add_argument('batch_command', choices=BATCH_KEYS.keys(), help='the command to run for every row.')
+    subparsers['batch'].add_argument('--input', '-i', default='-', help='(optional, defaults to STDIN): file with one id per line, or one JSON object of parameters per line (e.g. {"appId": "com.example", "lang": "de"}).')
+    subparsers['batch'].add_argument('--failures', default='failures.jsonl', help='(optional, defaults to \'failures.jsonl\'): file the failed rows are written to; it can be passed back as --input to retry them.')
+    subparsers['batch'].add_argument('--concurrency', default=10, type=int, help='(optional, defaults to 10): the maximum number of requests in flight.')
+    subparsers['batch'].add_argument('--workers', default=1, type=int, help='(optional, defaults to 1): the number of Node processes requests are dispatched to.')
+    subparsers['batch'].add_argument('--ordered', action='store_true', help='(optional, defaults to false): if true, results are written in the order of the input instead of as soon as they complete.')
+    subparsers['batch'].add_argument('--lang', help='(optional, defaults to \'en\'): the two letter language code used for rows that do not set one.')
+    subparsers['batch'].add_argument('--country', help='(optional, defaults to \'us\'): the two letter country code used for rows that do not set one.')
+
+    # Create the parser for the 'discover' command.
+    comma_list = lambda x: x.split(',')
+    subparsers['discover'] = handle.add_parser('discover', help='Discovers the catalog breadth-first, from the lists of each category and collection to similar apps and developers.')
+    subparsers['discover'].add_argument('--seeds', type=comma_list, help='(optional, defaults to none): comma separated application ids to start from; when set, categories and collections are only listed if given.')
+    subparsers['discover'].add_argument('--categories', type=comma_list, help='(optional, defaults to all): comma separated categories to list.')
+    subparsers['discover'].add_argument('--collections', type=comma_list, help='(optional, defaults to all): comma separated collections to list for each category.')
+    subparsers['discover'].add_argument('--expand', type=comma_list, default=['similar', 'developer'], help='(optional, defaults to similar,developer): the calls used to expand each application.')
+    subparsers['discover'].add_argument('--max_depth', default=2, type=int, help='(optional, defaults to 2): the number of expansions from the lists and seeds.')
+    subparsers['discover'].add_argument('--max_apps', type=int, help='(optional, defaults to no limit): the number of applications after which the crawl stops.')
+    subparsers['discover'].add_argument('--max_calls', type=int, help='(optional, defaults to no limit): the number of calls after which the crawl stops.')
+    subparsers['discover'].add_argument('--concurrency', default=10, type=int, help='(optional, defaults to 10): the maximum number of requests in flight.')
+    subparsers['discover'].add_argument('--workers', default=1, type=int, help='(optional, defaults to 1): the number of Node processes requests are dispatched to.')
+    subparsers['discover'].add_argument('--index', default='set', choices=['set', 'bloom'], help='(optional, defaults to set): the index of visited ids, an exact set spilled to disk or a Bloom filter.')
+    subparsers['discover'].add_argument('--index_path', help='(optional, defaults to a temporary file): the SQLite file the set index spills to.')
+    subparsers['discover'].add_argument('--lang', help='(optional, defaults to \'en\'): the two letter language code used to retrieve the applications.')
+    subparsers['discover'].add_argument('--country', help='(optional, defaults to \'us\'): the two letter country code used to retrieve the applications.')
+
+    # Create the parsers for the work queue commands.
+    subparsers['enqueue'] = handle.add_parser('enqueue', help='Adds a task to a work queue for every application id (or parameter row) of a file.')
+    subparsers['enqueue'].add_argument('enqueue_command', choices=BATCH_KEYS.keys(), help='the command to run for every row.')
+    subparsers['enqueue'].add_argument('--queue', '-q', required=True, help='the work queue: redis://host:port/db, or the path of a SQLite file.')
+    subparsers['enqueue'].add_argument('--input', '-i', default='-', help='(optional, defaults to STDIN): file with one id per line, or one JSON object of parameters per line.')
+    subparsers['enqueue'].add_argument('--shards', default=64, type=int, help='(optional, defaults to 64): the number of shards, only used when the queue is created.')
+    subparsers['enqueue'].add_argument('--lang', help='(optional, defaults to \'en\'): the two letter language code used for rows that do not set one.')
+    subparsers['enqueue'].add_argument('--country', help='(optional, defaults to \'us\'): the two letter country code used for rows that do not set one.')
+
+    subparsers['worker'] = handle.add_parser('worker', help='Runs the tasks of a work queue, leasing the shards of this node.')
+    subparsers['worker'].add_argument('--queue', '-q', required=True, help='the work queue: redis://host:port/db, or the path of a SQLite file.')
+    subparsers['worker'].add_argument('--node', type=lambda x: tuple(int(y) for y in x.split('/')), help='(optional, defaults to all shards): the index and number of nodes the shards are split between, e.g. 2/8.')
+    subparsers['worker'].add_argument('--steal', action='store_true', help='(optional, defaults to false): if true, tasks of other shards are run once the shards of this node are empty.')
+    subparsers['worker'].add_argument('--wait', action='store_true', help='(optional, defaults to false): if true, keep polling the queue once it is empty instead of exiting.')
+    subparsers['worker'].add_argument('--lease', default=120, type=float, help='(optional, defaults to 120): the number of seconds tasks are leased for; leases are renewed every third of it.')
+    subparsers['worker'].add_argument('--concurrency', default=10, type=int, help='(optional, defaults to 10): the maximum number of requests in flight.')
+    subparsers['worker'].add_argument('--workers', default=1, type=int, help='(optional, defaults to 1): the number of Node processes requests are dispatched to.')
+
     # Create the parser for the 'categories' command.
     subparsers['categories'] = handle.add_parser('categories', help='Retrieve a full list of categories present from dropdown menu on Google Play.')
 
+    # Add the field projection to the commands returning applications.
+    for command in ['app', 'list', 'search', 'developer', 'similar', 'batch', 'discover', 'enqueue']:
+        subparsers[command].add_argument('--fields', type=lambda x: x.split(','), help='(optional, defaults to all fields): comma separated fields to return for each application (e.g. appId,score,version).')
+
     # Add universal commands to all subparsers.
     for subparser in subparsers.values():
-        subparser.add_argument('--output_path', '-o', help='')
+        subparser.add_argument('--output_path', '-o', help='(optional, defaults to STDOUT): the file the results are written to.')
+        subparser.add_argument('--format', '-f', default='json', choices=scraper.output.FORMATS, help='(optional, defaults to json): the output format; jsonl and csv write one record per line as soon as it is available, parquet (which needs --output_path and pyarrow) one row group at a time.')
+        subparser.add_argument('--compression', choices=scraper.output.COMPRESSIONS, help='(optional, defaults to the extension of the output path): compress the output with gzip or zstd.')
         subparser.add_argument('--throttle', default=1, type=int, help='Upper bound to the amount of requests that will be attempted per second.')
         subparser.add_argument('--verbose', '-v', action='store_true', help='Enable verbose logging')
+        subparser.add_argument('--stats', action='store_true', help='(optional, defaults to false): print the call counts, latencies and bytes transferred to STDERR at the end of the run.')
+
+    # Create the parser for the 'serve' command, which writes no results itself.
+    serve = handle.add_parser('serve', help='Serves every command over HTTP/JSON, sharing warm Node workers, the cache and the rate limits between clients.')
+    serve.add_argument('--host', default='127.0.0.1', help='(optional, defaults to 127.0.0.1): the address to listen on.')
+    serve.add_argument('--port', default=8080, type=int, help='(optional, defaults to 8080): the TCP port to listen on.')
+    serve.add_argument('--socket', help='(optional, defaults to none): the path of a Unix socket to listen on instead of a TCP port.')
+    serve.add_argument('--workers', default=1, type=int, help='(optional, defaults to 1): the number of Node processes requests are dispatched to.')
+    serve.add_argument('--rate_limit', type=float, help='(optional, defaults to no limit): the maximum number of requests per second sent to Google Play, across all clients.')
+    serve.add_argument('--retries', default=2, type=int, help='(optional, defaults to 2): the number of times a call is retried after a transient failure.')
+    serve.add_argument('--timeout', type=float, help='(optional, defaults to 300): the number of seconds to wait for the Node worker to answer a request.')
+    serve.add_argument('--no_cache', action='store_true', help='(optional, defaults to false): if true, responses are neither cached on disk nor memoized.')
+    serve.add_argument('--verbose', '-v', action='store_true', help='Enable verbose logging')
+
+    # Create the parsers for the Node module management commands.
+    handle.add_parser('update-modules', help='Updates the google-play-scraper Node module from the npm registry.')
+    handle.add_parser('check-modules', help='Checks whether the google-play-scraper Node module can be loaded.')
 
     return parser, subparsers
 
@@ -110,6 +200,34 @@ class CommandLineTool:
         wrapper_fns = [x for x in wrapper_fns if len(x) > 0 and x[0] != '_']
         vargs = {k:v for k, v in vars(args).items() if v is not None}
 
+        # Node module management commands take no arguments.
+        if args.command in MODULE_COMMANDS:
+            print(getattr(scraper, args.command.replace('-', '_'))())
+            return
+
+        if args.command == 'batch':
+            logger.setLevel(logging.DEBUG) if args.verbose else logger.setLevel(logging.INFO)
+            self._run_batch(args)
+            self._print_stats(args)
+            return
+
+        if args.command == 'discover':
+            logger.setLevel(logging.DEBUG) if args.verbose else logger.setLevel(logging.INFO)
+            self._run_discover(args)
+            self._print_stats(args)
+            return
+
+        if args.command == 'serve':
+            logger.setLevel(logging.DEBUG) if args.verbose else logger.setLevel(logging.INFO)
+            self._run_serve(args)
+            return
+
+        if args.command in ['enqueue', 'worker']:
+            logger.setLevel(logging.DEBUG) if args.verbose else logger.setLevel(logging.INFO)
+            getattr(self, '_run_' + args.command)(args)
+            self._print_stats(args)
+            return
+
         # Check if the supplied command is valid.
         if args.command is None or not hasattr(scraper, args.command):
             print('Unrecognized command: {}.'.format(args.command))
@@ -117,14 +235,137 @@ class CommandLineTool:
             exit(1)
 
         logger.setLevel(logging.DEBUG) if args.verbose else logger.setLevel(logging.INFO)
-        results = getattr(scraper, args.command)(**vargs)
+        results = self._get_results(args.command, vargs, args.format)
 
         # Save output to file if provided or print to STDOUT.
-        print(results) if args.output_path is None else self._save_results(results, args.output_path)
+        scraper.output.write_results(results, args.output_path, args.format, args.compression, args.command)
+        self._print_stats(args)
+
+    def _print_stats(self, args):
+        if args.stats:
+            print(scraper.metrics_export('summary'), file=sys.stderr)
+
+    def _get_results(self, command, vargs, format):
+        # Large review pulls are streamed page by page, unless a single JSON document is wanted.
+        if command == 'reviews' and format != 'json' and 'paginate' not in vargs:
+            vargs['max_reviews'] = int(vargs.pop('num', 100))
+            return scraper.iter_reviews(**vargs)
+        return getattr(scraper, command)(**vargs)
+
+    def _run_batch(self, args):
+        scraper.configure(workers=args.workers)
+        rows = self._read_rows(args.input, BATCH_KEYS[args.batch_command])
+        vargs = {k: getattr(args, k) for k in ['lang', 'country', 'throttle', 'fields'] if getattr(args, k) is not None}
+        results = scraper.batch(args.batch_command, rows, args.concurrency, args.ordered, **vargs)
+
+        failures = _FailureLog(args.failures)
+        completed = False
+        try:
+            records = self._get_batch_records(results, failures)
+            scraper.output.write_results(
+                records, args.output_path, args.format, args.compression, args.batch_command)
+            completed = True
+        finally:
+            failures.close(completed)
+        if failures.count:
+            logger.warning('{} rows failed, see {}.'.format(failures.count, args.failures))
+
+    def _run_discover(self, args):
+        scraper.configure(workers=args.workers)
+        keys = ['categories', 'collections', 'seeds', 'expand', 'max_depth', 'max_apps', 'max_calls',
+                'concurrency', 'index', 'index_path', 'lang', 'country', 'throttle', 'fields']
+        vargs = {k: getattr(args, k) for k in keys if getattr(args, k) is not None}
+        with scraper.crawl.DiscoveryCrawler(**vargs) as crawler:
+            records = (app for app, depth in crawler.run())
+            scraper.output.write_results(records, args.output_path, args.format, args.compression, 'list')
+        logger.info('Discovered {} applications in {} calls ({} failed).'.format(
+            crawler.apps, crawler.calls, crawler.failed))
+
+    def _run_serve(self, args):
+        scraper.configure(
+            workers=args.workers, rate_limit=args.rate_limit, retries=args.retries, timeout=args.timeout,
+            cache=not args.no_cache, memo=not args.no_cache)
+        scraper.server.serve(args.host, args.port, args.socket)
+
+    def _run_enqueue(self, args):
+        rows = self._read_rows(args.input, BATCH_KEYS[args.enqueue_command])
+        vargs = {k: getattr(args, k) for k in ['lang', 'country', 'fields'] if getattr(args, k) is not None}
+        with scraper.coordinator.open_queue(args.queue, shards=args.shards) as queue:
+            added = queue.put(args.enqueue_command, rows, **vargs)
+            logger.info('Added {} tasks, the queue now holds {}.'.format(added, queue.info()))
+
+    def _run_worker(self, args):
+        scraper.configure(workers=args.workers)
+        with scraper.coordinator.open_queue(args.queue, lease=args.lease) as queue:
+            worker = scraper.coordinator.QueueWorker(
+                queue, args.node, args.steal, args.concurrency, args.wait, throttle=args.throttle)
+            tasks = worker.run()
+            first = next(tasks, None)
+            # The columns of the output follow the function of the tasks.
+            endpoint = 'app' if first is None else first[0]['command']
+            records = self._get_task_records(itertools.chain([first] if first else [], tasks))
+            scraper.output.write_results(records, args.output_path, args.format, args.compression, endpoint)
+        logger.info('Completed {} tasks ({} failed attempts).'.format(worker.completed, worker.failed))
+
+    def _read_rows(self, path, key):
+        stream = sys.stdin if path == '-' else open(path)
+        with stream:
+            for line in stream:
+                line = line.strip()
+                if line:
+                    yield json.loads(line) if line.startswith('{') else {key: line}
+
+    def _get_batch_records(self, results, failures):
+        for row, result in results:
+            if isinstance(result, scraper.exceptions.ScraperException):
+                logger.debug('Failed {}: {}'.format(row, result))
+                failures.write(row)
+                continue
+            # Keep the parameters of the row on object results (e.g. the appId of datasafety).
+            for record in scraper.output._records(result):
+                yield {**row, **record} if isinstance(record, dict) else record
+
+    def _get_task_records(self, tasks):
+        # Failed tasks are requeued or kept by the queue itself.
+        for task, result in tasks:
+            if isinstance(result, scraper.exceptions.ScraperException):
+                continue
+            row = {k: v for k, v in task['params'].items() if k != 'fields'}
+            for record in scraper.output._records(result):
+                yield {**row, **record} if isinstance(record, dict) else record
+
+class _FailureLog:
+    """
+    Failed rows of a batch, written to a temporary file that only replaces the
+    failures file once the batch completed. The failures file can be the input
+    of the batch, which is read lazily while the batch runs.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._file = None
+
+    def write(self, row):
+        # Only create the file once a row actually failed.
+        if self._file is None:
+            directory, name = os.path.split(os.path.abspath(self.path))
+            fd, self._temp_path = tempfile.mkstemp(prefix=name + '.', suffix='.tmp', dir=directory)
+            self._file = os.fdopen(fd, 'w')
+        self._file.write(json.dumps(row) + '\n')
+        self._file.flush()
+        self.count += 1
 
-    def _save_results(self, results, output_path):
-        with open(output_path, 'w') as f:
-            json.dump(results, f)
+    def close(self, completed=True):
+        if self._file is not None:
+            self._file.close()
+            if completed:
+                os.replace(self._temp_path, self.path)
+            else:
+                logger.warning('Batch interrupted, the rows that failed so far are in {}.'.format(self._temp_path))
+        elif completed and os.path.exists(self.path):
+            # A failures file left by a previous run must not pass for the result of this one.
+            os.remove(self.path)
 
 def main():
     _setup_logger()
@@ -0,0 +1,457 @@
+import asyncio
+import collections
+import itertools
+import json
+import logging
+import time
+
+import scraper.wrapper as _wrapper
+from .decoder import _Assembler
+from .exceptions import TransientException, _from_error
+from .metrics import _record_request
+from .models import _convert
+
+logger = logging.getLogger('__main__')
+
+# Upper bound for a single line of the worker (a chunk of a list result, or an object result).
+_STREAM_LIMIT = 2 ** 28
+
+# Private module classes.
+class _Worker:
+
+    def __init__(self, args, metrics=None):
+        self.args = args
+        self.metrics = metrics
+        self._process = None
+        self._pending = {}
+        self._tasks = ()
+        self._ids = itertools.count()
+        self._lock = None
+
+    @property
+    def load(self):
+        return len(self._pending)
+
+    async def call(self, method, params=None, timeout=None):
+        process = await self._ensure_started()
+        start = time.perf_counter()
+        request_id = next(self._ids)
+        message = json.dumps({
+            'jsonrpc': '2.0',
+            'id': request_id,
+            'method': method,
+            'params': params
+        })
+        logger.debug('Sending request: {}'.format(message))
+
+        pending = self._pending
+        pending[request_id] = asyncio.get_running_loop().create_future()
+        line = message.encode() + b'\n'
+        try:
+            process.stdin.write(line)
+            await process.stdin.drain()
+            response, stats = await asyncio.wait_for(pending[request_id], timeout)
+        except (BrokenPipeError, ConnectionResetError):
+            raise TransientException('Unable to send request to the Node worker.', code='EPIPE') from None
+        except asyncio.TimeoutError:
+            raise TransientException(
+                'Request {} timed out after {} seconds.'.format(method, timeout), code='ETIMEDOUT') from None
+        finally:
+            pending.pop(request_id, None)
+
+        if self.metrics is not None:
+            # Constant lookups are not scraper functions, and are recorded together.
+            name = method if method in _wrapper._Wrapper.api_keys else 'constants'
+            _record_request(
+                self.metrics, name, len(line), time.perf_counter() - start, response, stats)
+        if 'error' in response:
+            raise _from_error(response['error'])
+        return response.get('result')
+
+    async def stop(self):
+        process, self._process = self._process, None
+        if process is not None and process.returncode is None:
+            process.stdin.close()
+            try:
+                await asyncio.wait_for(process.wait(), 5)
+            except asyncio.TimeoutError:
+                process.kill()
+
+    async def _ensure_started(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            # Restart the worker if it crashed since the previous request.
+            if self._process is None:
+                await self._start()
+            return self._process
+
+    async def _start(self):
+        logger.debug('Starting Node worker.')
+        process = await asyncio.create_subprocess_exec(
+            *self.args,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            limit=_STREAM_LIMIT)
+        stderr = collections.deque(maxlen=20)
+        self._process, self._pending = process, {}
+        self._tasks = (
+            asyncio.ensure_future(self._read_stdout(process, self._pending, stderr, time.perf_counter())),
+            asyncio.ensure_future(self._read_stderr(process, stderr)),
+        )
+
+    async def _read_stdout(self, process, pending, stderr, started):
+        assembler = _Assembler()
+        while True:
+            line = await process.stdout.readline()
+            if not line:
+                break
+            response = assembler.feed(line)
+            if response is None:
+                continue
+            # The worker announces when the Node module is loaded.
+            if response.get('method') == 'ready' and self.metrics is not None:
+                self.metrics.observe('worker', 'startup', time.perf_counter() - started)
+            future = pending.get(response.get('id'))
+            if future is not None and not future.done():
+                future.set_result((response, assembler.stats))
+            elif 'id' in response:
+                # The caller timed out and its request was dropped.
+                logger.debug('Dropped the late response to request {}.'.format(response['id']))
+
+        # The worker exited; fail every request still waiting on it.
+        code = await process.wait()
+        message = 'Node worker exited with code {}: {}'.format(
+            code, b''.join(stderr).decode(errors='replace'))
+        if self._process is process:
+            self._process = None
+        for future in pending.values():
+            if not future.done():
+                future.set_result(({'error': {'message': message, 'code': 'EWORKER'}}, (0, 0.0)))
+
+    async def _read_stderr(self, process, stderr):
+        async for line in process.stderr:
+            stderr.append(line)
+
+
+class _WorkerPool:
+
+    def __init__(self, args, workers=1, concurrency=100, metrics=None):
+        self.loop = asyncio.get_running_loop()
+        self.args = args
+        self.workers = [_Worker(args, metrics) for _ in range(workers)]
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.lock = asyncio.Lock()
+
+    async def ensure_modules(self):
+        # Installing the Node module may run npm, so it never runs on the event loop.
+        async with self.lock:
+            if not _wrapper._wrapper.modules_installed:
+                await self.loop.run_in_executor(None, _wrapper._wrapper.ensure_modules)
+
+    async def call(self, method, params=None, timeout=None):
+        async with self.semaphore:
+            worker = min(self.workers, key=lambda x: x.load)
+            return await worker.call(method, params, timeout=timeout)
+
+    async def stop(self):
+        await asyncio.gather(*[worker.stop() for worker in self.workers])
+
+
+# Private module attributes.
+_options = {'timeout': _wrapper.DEFAULT_TIMEOUT, 'workers': 1, 'concurrency': 100}
+_pool = None
+
+# Public module methods - coroutine versions of the scraper API.
+async def app(appId, lang='en', country='us', **kwargs):
+    """
+    Coroutine version of `scraper.app`; see its documentation for the parameters.
+
+    Returns
+    -------
+    dict
+        Dictionary containing the full details of an application.
+    """
+    vargs = {
+        'appId': appId,
+        'lang': lang,
+        'country': country,
+        **kwargs
+    }
+    return await _execute_api('app', **vargs)
+
+async def list(collection=None, category=None, age=None, num=500, lang='en', country='us', fullDetail=False, **kwargs):
+    """
+    Coroutine version of `scraper.list`; see its documentation for the parameters.
+
+    Returns
+    -------
+    list of dict
+        List of dictionaries containing details of applications from one of the collections at Google Play.
+    """
+    vargs = {
+        'collection': (await _get_constants())['collection']['TOP_FREE'] if collection is None else collection,
+        'category': category,
+        'age': age,
+        'num': num,
+        'lang': lang,
+        'country': country,
+        'fullDetail': fullDetail,
+        **kwargs
+    }
+    return await _execute_api('list', **vargs)
+
+async def search(term, num=20, lang='en', country='us', fullDetail=False, price='all', **kwargs):
+    """
+    Coroutine version of `scraper.search`; see its documentation for the parameters.
+
+    Returns
+    -------
+    list of dict
+        List of dictionaries containing details of applications that result from searching by the given term.
+    """
+    vargs = {
+        'term': term,
+        'num': num,
+        'lang': lang,
+        'country': country,
+        'fullDetail': fullDetail,
+        'price': price,
+        **kwargs
+    }
+    return await _execute_api('search', **vargs)
+
+async def developer(devId, lang='en', country='us', num=60, fullDetail=False, **kwargs):
+    """
+    Coroutine version of `scraper.developer`; see its documentation for the parameters.
+
+    Returns
+    -------
+    list of dict
+        List of dictionaries containing details of applications by the given developer name.
+    """
+    vargs = {
+        'devId': devId,
+        'lang': lang,
+        'country': country,
+        'num': num,
+        'fullDetail': fullDetail,
+        **kwargs
+    }
+    return await _execute_api('developer', **vargs)
+
+async def suggest(term, lang='en', country='us', **kwargs):
+    """
+    Coroutine version of `scraper.suggest`; see its documentation for the parameters.
+
+    Returns
+    -------
+    list of str
+        List of suggestions to complete the given search query term.
+    """
+    vargs = {
+        'term': term,
+        'lang': lang,
+        'country': country,
+        **kwargs
+    }
+    return await _execute_api('suggest', **vargs)
+
+async def reviews(appId, lang='en', country='us', sort=None, num=100, paginate=False, nextPaginationToken=None, **kwargs):
+    """
+    Coroutine version of `scraper.reviews`; see its documentation for the parameters.
+
+    Returns
+    -------
+    list of dict
+        List of dictionaries containing the reviews and the nextPaginationToken.
+    """
+    vargs = {
+        'appId': appId,
+        'lang': lang,
+        'country': country,
+        'sort': (await _get_constants())['sort']['NEWEST'] if sort is None else sort,
+        'num': num,
+        'paginate': paginate,
+        'nextPaginationToken': nextPaginationToken,
+        **kwargs
+    }
+    return await _execute_api('reviews', **vargs)
+
+async def similar(appId, lang='en', country='us', fullDetail=False, **kwargs):
+    """
+    Coroutine version of `scraper.similar`; see its documentation for the parameters.
+
+    Returns
+    -------
+    list of dict
+        List of dictionaries containing details of applications similar to the one specified.
+    """
+    vargs = {
+        'appId': appId,
+        'lang': lang,
+        'country': country,
+        'fullDetail': fullDetail,
+        **kwargs
+    }
+    return await _execute_api('similar', **vargs)
+
+async def permissions(appId, lang='en', short=False, **kwargs):
+    """
+    Coroutine version of `scraper.permissions`; see its documentation for the parameters.
+
+    Returns
+    -------
+    list of dict or list of str
+        List of dictionaries (if `short` is True) or list of strings (if `short` is False)
+        corresponding to the permissions an app has access to.
+    """
+    vargs = {
+        'appId': appId,
+        'lang': lang,
+        'short': short,
+        **kwargs
+    }
+    return await _execute_api('permissions', **vargs)
+
+async def datasafety(appId, lang='en', **kwargs):
+    """
+    Coroutine version of `scraper.datasafety`; see its documentation for the parameters.
+
+    Returns
+    -------
+    dict
+        Dictionary containing the data shared, data collected, security practices and privacy policy URL.
+    """
+    vargs = {
+        'appId': appId,
+        'lang': lang,
+        **kwargs
+    }
+    return await _execute_api('datasafety', **vargs)
+
+async def categories(**kwargs):
+    """
+    Coroutine version of `scraper.categories`.
+
+    Returns
+    -------
+    list of str
+        List containing available categories from the dropdown menu on Google Play Store.
+    """
+    return await _execute_api('categories', **kwargs)
+
+def configure(timeout=None, workers=None, concurrency=None):
+    """
+    Configures the Node workers used by the coroutines. Changes apply to the
+    workers started after the next call to `close`.
+
+    Parameters
+    ----------
+    timeout : float, optional
+        Default number of seconds to wait for an answer to each request (default is 300).
+    workers : int, optional
+        Number of Node processes requests are dispatched to (default is 1).
+    concurrency : int, optional
+        Maximum number of requests in flight across the event loop (default is 100).
+    """
+    vargs = {'timeout': timeout, 'workers': workers, 'concurrency': concurrency}
+    _options.update({k: v for k, v in vargs.items() if v is not None})
+
+async def close():
+    """
+    Stops the Node workers of the running event loop.
+    """
+    global _pool
+    pool, _pool = _pool, None
+    if pool is not None and pool.loop is asyncio.get_running_loop():
+        await pool.stop()
+
+# Private module methods.
+async def _get_pool():
+    global _pool
+    # Subprocess pipes are bound to the event loop that created them.
+    if _pool is None or _pool.loop is not asyncio.get_running_loop():
+        args = _wrapper._wrapper.pool.args
+        _pool = _WorkerPool(
+            args, _options['workers'], _options['concurrency'], _wrapper._wrapper.metrics)
+    if not _wrapper._wrapper.modules_installed:
+        await _pool.ensure_modules()
+    return _pool
+
+async def _get_constants():
+    # Same constants as the synchronous API, but read from the disk in an executor
+    # and, on a cold cache, requested from the asyncio workers.
+    wrapper = _wrapper._wrapper
+    if wrapper.constants is None:
+        pool = await _get_pool()
+        constants = await pool.loop.run_in_executor(None, wrapper._read_constants)
+        if constants is None:
+            names = wrapper.constant_names
+            values = await asyncio.gather(*[pool.call(x, timeout=_options['timeout']) for x in names])
+            constants = dict(zip(names, values))
+            await pool.loop.run_in_executor(None, wrapper._write_constants, constants)
+        wrapper.constants = constants
+    return wrapper.constants
+
+async def _execute_api(fn_name, **kwargs):
+    # The response cache, memo and metrics are shared with the synchronous API.
+    start = time.perf_counter()
+    wrapper = _wrapper._wrapper
+    kwargs.setdefault('timeout', _options['timeout'])
+    options = wrapper._get_options(kwargs)
+    params = wrapper._get_args(wrapper.api_keys[fn_name], **kwargs)
+    key = wrapper.cache.key(fn_name, params)
+    fetched = []
+    def fetch():
+        fetched.append(key)
+        return _fetch(fn_name, params, key, options)
+    try:
+        output = await wrapper.memo.acall(
+            key, fn_name, fetch, options['memo'], options['refresh'])
+    except Exception:
+        wrapper.metrics.count(fn_name, 'errors')
+        raise
+    finally:
+        wrapper.metrics.count(fn_name, 'calls')
+        wrapper.metrics.observe(fn_name, 'call', time.perf_counter() - start)
+    if not fetched:
+        # Answered by the memo, or by an identical call already in flight.
+        wrapper.metrics.count(fn_name, 'memo_hits')
+    return _convert(fn_name, output) if options['as_objects'] else output
+
+async def _fetch(fn_name, params, key, options):
+    # The SQLite cache is read and written in an executor, off the event loop.
+    wrapper = _wrapper._wrapper
+    loop = asyncio.get_running_loop()
+    use_cache = options['cache'] and not options['refresh']
+    output = await loop.run_in_executor(None, wrapper.cache.get, key) if use_cache else None
+    if output is not None:
+        wrapper.metrics.count(fn_name, 'cache_hits')
+    else:
+        output = await _request(fn_name, params, options)
+        if options['cache']:
+            await loop.run_in_executor(None, wrapper.cache.set, key, fn_name, output)
+    return output
+
+async def _request(fn_name, params, options):
+    # Only transient failures (network, throttling, timeouts) are retried.
+    wrapper = _wrapper._wrapper
+    for attempt in itertools.count():
+        if wrapper.rate_limiter.shared:
+            delay = await asyncio.get_running_loop().run_in_executor(None, wrapper.rate_limiter.reserve, fn_name)
+        else:
+            delay = wrapper.rate_limiter.reserve(fn_name)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        try:
+            pool = await _get_pool()
+            return await pool.call(fn_name, params, timeout=options['timeout'])
+        except TransientException as e:
+            if attempt >= options['retries']:
+                raise
+            delay = wrapper._get_backoff(attempt)
+            logger.debug('Retrying {} in {:.2f} seconds: {}'.format(fn_name, delay, e))
+            wrapper.metrics.count(fn_name, 'retries')
+            await asyncio.sleep(delay)
@@ -0,0 +1,266 @@
+import asyncio
+import collections
+import hashlib
+import os
+import sqlite3
+import threading
+import logging
+import json
+import time
+import zlib
+
+from .decoder import loads
+
+logger = logging.getLogger('__main__')
+
+# Default number of seconds a response stays fresh, per endpoint.
+HOUR, DAY = 60 * 60, 24 * 60 * 60
+DEFAULT_TTL = {
+    'app': DAY,
+    'list': DAY,
+    'search': 6 * HOUR,
+    'developer': DAY,
+    'suggest': HOUR,
+    'reviews': HOUR,
+    'similar': DAY,
+    'permissions': DAY,
+    'datasafety': DAY,
+    'categories': 7 * DAY,
+}
+
+# Private module classes.
+class _Cache:
+
+    schema = (
+        "CREATE TABLE IF NOT EXISTS responses ("
+        "key TEXT PRIMARY KEY, endpoint TEXT, value BLOB,"
+        "size INTEGER, created REAL, accessed REAL);"
+        "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed);"
+    )
+
+    def __init__(self, path, max_size=256 * 2 ** 20, ttl=None):
+        self.path = path
+        self.max_size = max_size
+        self.ttl = {**DEFAULT_TTL, **(ttl or {})}
+        self.hits = 0
+        self.misses = 0
+        self._size = None
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def key(self, endpoint, params):
+        # Arguments that do not change the response are left out of the key.
+        params = {k: v for k, v in params.items() if k != 'throttle'}
+        digest = hashlib.sha1(json.dumps(
+            params, sort_keys=True, separators=(',', ':')).encode()).hexdigest()
+        return '{}:{}'.format(endpoint, digest)
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            db = self._connect()
+            row = db.execute(
+                'SELECT endpoint, value, created FROM responses WHERE key = ?',
+                (key,)).fetchone()
+            if row is None or row[2] + self.ttl.get(row[0], DAY) < now:
+                self.misses += 1
+                return None
+            db.execute('UPDATE responses SET accessed = ? WHERE key = ?', (now, key))
+            db.commit()
+            self.hits += 1
+        return loads(zlib.decompress(row[1]))
+
+    def set(self, key, endpoint, value):
+        blob = zlib.compress(json.dumps(value, separators=(',', ':')).encode())
+        now = time.time()
+        with self._lock:
+            db = self._connect()
+            db.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)',
+                (key, endpoint, blob, len(blob), now, now))
+            db.commit()
+            # The running size is only an estimate when several processes
+            # share the file, so it is recomputed before evicting anything.
+            self._size += len(blob)
+            if self._size > self.max_size:
+                self._evict(db)
+
+    def clear(self):
+        with self._lock:
+            db = self._connect()
+            db.execute('DELETE FROM responses')
+            db.commit()
+            self._size = 0
+            self.hits = self.misses = 0
+
+    def info(self):
+        with self._lock:
+            db = self._connect()
+            entries, size = db.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses').fetchone()
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': entries,
+            'size': size,
+            'max_size': self.max_size,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def _connect(self):
+        if self._connection is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._connection = sqlite3.connect(
+                self.path, timeout=30, check_same_thread=False)
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.executescript(self.schema)
+            self._size = self._connection.execute(
+                'SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        return self._connection
+
+    def _evict(self, db):
+        # Drop the least recently used entries until 90% of the size cap.
+        self._size = db.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        excess = self._size - int(self.max_size * 0.9)
+        if excess <= 0:
+            return
+        evicted = 0
+        for key, size in db.execute(
+                'SELECT key, size FROM responses ORDER BY accessed').fetchall():
+            if evicted >= excess:
+                break
+            db.execute('DELETE FROM responses WHERE key = ?', (key,))
+            evicted += size
+        db.commit()
+        self._size -= evicted
+        logger.debug('Evicted {} bytes from the response cache.'.format(evicted))
+
+
+class _Memo:
+
+    def __init__(self, max_size=1024, ttl=None):
+        self.max_size = max_size
+        self.ttl = DEFAULT_TTL if ttl is None else ttl
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._entries = collections.OrderedDict()
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def call(self, key, endpoint, fn, store=True, refresh=False):
+        with self._lock:
+            found, value = self._lookup(key, store and not refresh)
+            if found:
+                return value
+            # Identical requests already in flight share their response.
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                # Only calls that would have been answered by the memo count as misses.
+                self.misses += store
+                flight = self._flights[key] = _Flight()
+            else:
+                self.coalesced += 1
+        if not leader:
+            return flight.wait()
+
+        try:
+            value = fn()
+        except BaseException as e:
+            flight.fail(e)
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+                if flight.error is None and store:
+                    self._store(key, endpoint, value)
+        return flight.set(value)
+
+    async def acall(self, key, endpoint, fn, store=True, refresh=False):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            found, value = self._lookup(key, store and not refresh)
+            if found:
+                return value
+            # Futures can only be shared by callers on the same event loop.
+            task = self._flights.get((loop, key))
+            if task is None:
+                self.misses += store
+                task = self._flights[(loop, key)] = loop.create_task(
+                    self._afetch(loop, key, endpoint, fn, store))
+                # Retrieve the exception so that it is not reported as unhandled if every caller left.
+                task.add_done_callback(lambda x: x.cancelled() or x.exception())
+            else:
+                self.coalesced += 1
+        # The request runs in its own task, so that a cancelled caller, the first one
+        # included, does not cancel it for the other callers sharing it.
+        return await asyncio.shield(task)
+
+    async def _afetch(self, loop, key, endpoint, fn, store):
+        try:
+            value = await fn()
+        finally:
+            with self._lock:
+                self._flights.pop((loop, key), None)
+        if store:
+            with self._lock:
+                self._store(key, endpoint, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.coalesced = 0
+
+    def info(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'entries': len(self._entries),
+            'max_size': self.max_size,
+        }
+
+    def _lookup(self, key, use_entries):
+        entry = self._entries.get(key) if use_entries else None
+        if entry is None or entry[0] < time.time():
+            return False, None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return True, entry[1]
+
+    def _store(self, key, endpoint, value):
+        self._entries[key] = (time.time() + self.ttl.get(endpoint, DAY), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+
+class _Flight:
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+    def set(self, value):
+        self.value = value
+        self.done.set()
+        return value
+
+    def fail(self, error):
+        self.error = error
+        self.done.set()
+
+    def wait(self):
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.value
@@ -0,0 +1,699 @@
+import abc
+import hashlib
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+import scraper.scraper as _scraper
+import scraper.wrapper as _wrapper
+from .exceptions import ScraperException, NotFoundException, ParseException
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger('__main__')
+
+# Default number of shards tasks are spread over, fixed when a queue is created.
+SHARDS = 64
+
+# Failures that will not succeed on another attempt.
+_PERMANENT = (NotFoundException, ParseException)
+
+# Private module classes.
+class _Queue(abc.ABC):
+    """
+    Work queue of scrape tasks (a scraper function and its arguments) with lease,
+    heartbeat and requeue semantics, shared by the SQLite and Redis backends.
+
+    A worker leases tasks for `lease` seconds and must heartbeat them, complete
+    them or fail them before the lease expires; expired leases are requeued on
+    the next call to `lease`, and failed tasks are only leased again once their
+    backoff (see `scraper.configure`) elapsed. Each task is assigned to a shard by the hash of its
+    appId (or of its arguments), so that a node only leasing its own shards keeps
+    the per-application cache and memo entries local.
+    """
+
+    def __init__(self, shards=SHARDS, lease=120, max_attempts=3):
+        self.shards = shards
+        self.lease_time = lease
+        self.max_attempts = max_attempts
+
+    def put(self, command, items, **kwargs):
+        """
+        Adds scrape tasks to the queue. A task already pending or leased is not added twice.
+
+        Parameters
+        ----------
+        command : str
+            Name of the scraper function to call (e.g. 'app', 'datasafety', 'reviews').
+        items : iterable of str or dict
+            Ids (passed as the first argument of the function) or keyword arguments of each call.
+        **kwargs : dict
+            Keyword arguments shared by every call; values of an item take precedence.
+
+        Returns
+        -------
+        int
+            The number of tasks added.
+        """
+        if command not in _wrapper._Wrapper.api_keys:
+            raise ValueError('Unknown scraper function: {}.'.format(command))
+        key = _wrapper._Wrapper.api_keys[command][0]
+        tasks = []
+        for item in items:
+            params = {**kwargs, **(item if isinstance(item, dict) else {key: item})}
+            data = _encode({'command': command, 'params': params})
+            tasks.append((hashlib.sha1(data.encode()).hexdigest(), self.shard(params), data))
+        return self._put(tasks)
+
+    def shard(self, params):
+        """
+        Returns the shard of a task from its arguments.
+        """
+        key = params.get('appId') or _encode(params)
+        return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'big') % self.shards
+
+    def node_shards(self, index, count):
+        """
+        Returns the shards leased by the node `index` of `count` nodes.
+        """
+        return [x for x in range(self.shards) if x % count == index]
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @abc.abstractmethod
+    def _put(self, tasks):
+        pass
+
+    def _task(self, id, data, shard, attempts):
+        task = json.loads(data)
+        return {'id': id, 'command': task['command'], 'params': task['params'], 'shard': shard, 'attempts': attempts}
+
+
+# Public module classes.
+class SQLiteQueue(_Queue):
+    """
+    Work queue stored in a SQLite file, for single-host runs and tests. Several
+    worker processes of the same host can share it.
+
+    Parameters
+    ----------
+    path : str
+        Path of the SQLite file, created if missing.
+    shards : int, optional
+        Number of shards, only used when the queue is created (default is 64).
+    lease : float, optional
+        Number of seconds a task is leased for (default is 120).
+    max_attempts : int, optional
+        Number of failed attempts after which a task is marked as failed (default is 3).
+    """
+
+    schema = (
+        "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);"
+        "CREATE TABLE IF NOT EXISTS tasks ("
+        "id TEXT PRIMARY KEY, data TEXT, shard INTEGER, state TEXT, attempts INTEGER,"
+        "owner TEXT, deadline REAL, error TEXT, seq INTEGER, not_before REAL);"
+        "CREATE INDEX IF NOT EXISTS tasks_pending ON tasks (state, shard, seq);"
+        "CREATE INDEX IF NOT EXISTS tasks_deadline ON tasks (state, deadline);"
+    )
+
+    def __init__(self, path, shards=SHARDS, lease=120, max_attempts=3):
+        super().__init__(shards, lease, max_attempts)
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connection = sqlite3.connect(path, timeout=60, check_same_thread=False, isolation_level=None)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.executescript(self.schema)
+        with self._transaction() as db:
+            db.execute("INSERT OR IGNORE INTO meta VALUES ('shards', ?)", (str(shards),))
+            self.shards = int(db.execute("SELECT value FROM meta WHERE key = 'shards'").fetchone()[0])
+
+    def lease(self, worker, n=1, shards=None, lease=None):
+        """
+        Leases up to `n` pending tasks, after requeuing the tasks whose lease expired.
+
+        Parameters
+        ----------
+        worker : str
+            Id of the worker leasing the tasks.
+        n : int, optional
+            Maximum number of tasks to lease (default is 1).
+        shards : list of int, optional
+            Only tasks of these shards are leased (default is None, any shard).
+        lease : float, optional
+            Number of seconds the tasks are leased for (default is the lease of the queue).
+
+        Returns
+        -------
+        list of dict
+            The tasks, with their `id`, `command`, `params`, `shard` and number of previous `attempts`.
+        """
+        now = time.time()
+        deadline = now + (lease or self.lease_time)
+        query, args = "state = 'pending' AND (not_before IS NULL OR not_before <= ?)", [now]
+        if shards is not None:
+            query += ' AND shard IN ({})'.format(','.join('?' * len(shards)))
+            args += list(shards)
+        with self._transaction() as db:
+            self._requeue(db, now)
+            rows = db.execute(
+                'SELECT id, data, shard, attempts FROM tasks WHERE ' + query + ' ORDER BY seq LIMIT ?',
+                args + [n]).fetchall()
+            db.executemany(
+                "UPDATE tasks SET state = 'leased', owner = ?, deadline = ? WHERE id = ?",
+                [(worker, deadline, row[0]) for row in rows])
+        return [self._task(*row) for row in rows]
+
+    def heartbeat(self, worker, ids, lease=None):
+        """
+        Extends the lease of tasks still held by a worker.
+
+        Returns
+        -------
+        list of str
+            The ids of the tasks still held, the other leases were lost.
+        """
+        deadline = time.time() + (lease or self.lease_time)
+        held = []
+        with self._transaction() as db:
+            for id in ids:
+                cursor = db.execute(
+                    "UPDATE tasks SET deadline = ? WHERE id = ? AND owner = ? AND state = 'leased'",
+                    (deadline, id, worker))
+                if cursor.rowcount:
+                    held.append(id)
+        return held
+
+    def complete(self, worker, id):
+        """
+        Marks a leased task as done. Returns False if the worker no longer held its lease.
+        """
+        with self._transaction() as db:
+            cursor = db.execute(
+                "UPDATE tasks SET state = 'done', owner = NULL, deadline = NULL, error = NULL "
+                "WHERE id = ? AND owner = ? AND state = 'leased'", (id, worker))
+        return cursor.rowcount > 0
+
+    def fail(self, worker, id, error, retry=True):
+        """
+        Requeues a leased task that failed, or marks it as failed once it reached
+        `max_attempts` or if `retry` is False. Returns False if the worker no longer held its lease.
+        """
+        with self._transaction() as db:
+            row = db.execute(
+                "SELECT attempts FROM tasks WHERE id = ? AND owner = ? AND state = 'leased'",
+                (id, worker)).fetchone()
+            if row is None:
+                return False
+            state = 'pending' if retry and row[0] + 1 < self.max_attempts else 'failed'
+            not_before = time.time() + _wrapper._wrapper._get_backoff(row[0])
+            db.execute(
+                'UPDATE tasks SET state = ?, attempts = attempts + 1, owner = NULL, deadline = NULL, '
+                'error = ?, not_before = ? WHERE id = ?', (state, str(error), not_before, id))
+        return True
+
+    def next_retry(self, shards=None):
+        """
+        Returns the time at which the next failed task of `shards` can be leased again,
+        or None if no task is waiting for its backoff.
+        """
+        query, args = "state = 'pending' AND not_before > ?", [time.time()]
+        if shards is not None:
+            query += ' AND shard IN ({})'.format(','.join('?' * len(shards)))
+            args += list(shards)
+        with self._lock:
+            return self._connection.execute('SELECT MIN(not_before) FROM tasks WHERE ' + query, args).fetchone()[0]
+
+    def requeue(self):
+        """
+        Returns the tasks whose lease expired to the pending tasks, and returns their number.
+        """
+        with self._transaction() as db:
+            return self._requeue(db, time.time())
+
+    def info(self):
+        """
+        Returns the number of pending, leased, done and failed tasks.
+        """
+        with self._lock:
+            rows = self._connection.execute('SELECT state, COUNT(*) FROM tasks GROUP BY state').fetchall()
+        return {**dict.fromkeys(['pending', 'leased', 'done', 'failed'], 0), **dict(rows)}
+
+    def failures(self):
+        """
+        Returns the tasks that failed for good, with their last `error`.
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT id, data, shard, attempts, error FROM tasks WHERE state = 'failed' ORDER BY seq").fetchall()
+        return [{**self._task(*row[:4]), 'error': row[4]} for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def _put(self, tasks):
+        with self._transaction() as db:
+            seq = db.execute('SELECT COALESCE(MAX(seq), 0) FROM tasks').fetchone()[0]
+            # Finished tasks are queued again, pending and leased ones are left alone.
+            cursor = db.executemany(
+                "INSERT INTO tasks VALUES (?, ?, ?, 'pending', 0, NULL, NULL, NULL, ?, NULL) "
+                "ON CONFLICT (id) DO UPDATE SET state = 'pending', attempts = 0, error = NULL, seq = excluded.seq, "
+                "not_before = NULL "
+                "WHERE state IN ('done', 'failed')",
+                [(id, data, shard, seq + i + 1) for i, (id, shard, data) in enumerate(tasks)])
+        return cursor.rowcount
+
+    def _requeue(self, db, now):
+        cursor = db.execute(
+            "UPDATE tasks SET state = 'pending', owner = NULL, deadline = NULL "
+            "WHERE state = 'leased' AND deadline < ?", (now,))
+        if cursor.rowcount:
+            logger.debug('Requeued {} tasks whose lease expired.'.format(cursor.rowcount))
+        return cursor.rowcount
+
+    def _transaction(self):
+        return _Transaction(self._connection, self._lock)
+
+
+class RedisQueue(_Queue):
+    """
+    Work queue stored in Redis (or a Redis-compatible server supporting Lua
+    scripts), for workers spread over many hosts. Every state change is a Lua
+    script, so that concurrent workers never lease the same task twice.
+
+    Parameters
+    ----------
+    url : str
+        URL of the server (e.g. 'redis://localhost:6379/0').
+    name : str, optional
+        Name of the queue, the prefix of its keys (default is 'scraper').
+    shards : int, optional
+        Number of shards, only used when the queue is created (default is 64).
+    lease : float, optional
+        Number of seconds a task is leased for (default is 120).
+    max_attempts : int, optional
+        Number of failed attempts after which a task is marked as failed (default is 3).
+    """
+
+    # KEYS: tasks, pending prefix, leases, owners, failed; ARGV: id, shard, data triples.
+    put_script = """
+        local added = 0
+        for i = 1, #ARGV, 3 do
+            if redis.call('HSETNX', KEYS[1], ARGV[i], ARGV[i + 2]) == 1 then
+                redis.call('HDEL', KEYS[5], ARGV[i])
+                redis.call('LPUSH', KEYS[2] .. ARGV[i + 1], ARGV[i])
+                added = added + 1
+            end
+        end
+        return added
+    """
+
+    # Requeues expired leases and failed tasks whose backoff elapsed, then pops tasks
+    # from the given shards in turn.
+    # KEYS: tasks, pending prefix, leases, owners, delayed; ARGV: worker, now, deadline, n, shards...
+    lease_script = """
+        local function requeue(now)
+            local expired = redis.call('ZRANGEBYSCORE', KEYS[3], '-inf', now)
+            for _, id in ipairs(expired) do
+                redis.call('ZREM', KEYS[3], id)
+                redis.call('HDEL', KEYS[4], id)
+                local task = redis.call('HGET', KEYS[1], id)
+                if task then
+                    redis.call('RPUSH', KEYS[2] .. cjson.decode(task).shard, id)
+                end
+            end
+            local due = redis.call('ZRANGEBYSCORE', KEYS[5], '-inf', now)
+            for _, id in ipairs(due) do
+                redis.call('ZREM', KEYS[5], id)
+                local task = redis.call('HGET', KEYS[1], id)
+                if task then
+                    redis.call('LPUSH', KEYS[2] .. cjson.decode(task).shard, id)
+                end
+            end
+            return #expired
+        end
+        requeue(ARGV[2])
+        local leased, count, n = {}, 0, tonumber(ARGV[4])
+        local found = true
+        while count < n and found do
+            found = false
+            for i = 5, #ARGV do
+                if count >= n then break end
+                local id = redis.call('RPOP', KEYS[2] .. ARGV[i])
+                if id then
+                    found = true
+                    count = count + 1
+                    redis.call('ZADD', KEYS[3], ARGV[3], id)
+                    redis.call('HSET', KEYS[4], id, ARGV[1])
+                    table.insert(leased, id)
+                    table.insert(leased, redis.call('HGET', KEYS[1], id))
+                end
+            end
+        end
+        return leased
+    """
+
+    # KEYS: leases, owners; ARGV: worker, deadline, ids...
+    heartbeat_script = """
+        local held = {}
+        for i = 3, #ARGV do
+            if redis.call('HGET', KEYS[2], ARGV[i]) == ARGV[1] then
+                redis.call('ZADD', KEYS[1], ARGV[2], ARGV[i])
+                table.insert(held, ARGV[i])
+            end
+        end
+        return held
+    """
+
+    # KEYS: tasks, pending prefix, leases, owners, failed, done, delayed;
+    # ARGV: worker, id, outcome, error, max attempts, time of the retry.
+    finish_script = """
+        local id = ARGV[2]
+        if redis.call('HGET', KEYS[4], id) ~= ARGV[1] then
+            return 0
+        end
+        redis.call('ZREM', KEYS[3], id)
+        redis.call('HDEL', KEYS[4], id)
+        local data = redis.call('HGET', KEYS[1], id)
+        if ARGV[3] == 'done' then
+            redis.call('HDEL', KEYS[1], id)
+            redis.call('INCR', KEYS[6])
+            return 1
+        end
+        local task = cjson.decode(data)
+        task.attempts = (task.attempts or 0) + 1
+        if ARGV[3] == 'retry' and task.attempts < tonumber(ARGV[5]) then
+            redis.call('HSET', KEYS[1], id, cjson.encode(task))
+            redis.call('ZADD', KEYS[7], ARGV[6], id)
+        else
+            task.error = ARGV[4]
+            redis.call('HDEL', KEYS[1], id)
+            redis.call('HSET', KEYS[5], id, cjson.encode(task))
+        end
+        return 1
+    """
+
+    def __init__(self, url, name='scraper', shards=SHARDS, lease=120, max_attempts=3):
+        if redis is None:
+            raise ImportError('The Redis work queue requires the redis package.')
+        super().__init__(shards, lease, max_attempts)
+        self.name = name
+        self._client = redis.Redis.from_url(url)
+        # The hash tag keeps every key of the queue on the same Redis Cluster slot.
+        prefix = '{{{}}}:'.format(name)
+        self._keys = {k: prefix + k for k in ['meta', 'tasks', 'pending:', 'leases', 'owners', 'failed', 'done', 'delayed']}
+        self._client.hsetnx(self._keys['meta'], 'shards', shards)
+        self.shards = int(self._client.hget(self._keys['meta'], 'shards'))
+        self._put_script = self._client.register_script(self.put_script)
+        self._lease_script = self._client.register_script(self.lease_script)
+        self._heartbeat_script = self._client.register_script(self.heartbeat_script)
+        self._finish_script = self._client.register_script(self.finish_script)
+
+    def lease(self, worker, n=1, shards=None, lease=None):
+        """
+        Leases up to `n` pending tasks, after requeuing the tasks whose lease expired.
+        See `SQLiteQueue.lease`.
+        """
+        now = time.time()
+        shards = range(self.shards) if shards is None else shards
+        keys = [self._keys[k] for k in ['tasks', 'pending:', 'leases', 'owners', 'delayed']]
+        leased = self._lease_script(keys, [worker, now, now + (lease or self.lease_time), n, *shards])
+        tasks = []
+        for id, data in zip(leased[::2], leased[1::2]):
+            task = json.loads(data)
+            tasks.append({'id': id.decode(), 'command': task['command'], 'params': task['params'],
+                          'shard': task['shard'], 'attempts': task.get('attempts', 0)})
+        return tasks
+
+    def heartbeat(self, worker, ids, lease=None):
+        """
+        Extends the lease of tasks still held by a worker, and returns their ids.
+        """
+        deadline = time.time() + (lease or self.lease_time)
+        held = self._heartbeat_script([self._keys['leases'], self._keys['owners']], [worker, deadline, *ids])
+        return [x.decode() for x in held]
+
+    def complete(self, worker, id):
+        """
+        Marks a leased task as done. Returns False if the worker no longer held its lease.
+        """
+        return self._finish(worker, id, 'done', '')
+
+    def fail(self, worker, id, error, retry=True):
+        """
+        Requeues a leased task that failed, or marks it as failed once it reached
+        `max_attempts` or if `retry` is False. Returns False if the worker no longer held its lease.
+        """
+        return self._finish(worker, id, 'retry' if retry else 'fail', str(error))
+
+    def requeue(self):
+        """
+        Returns the tasks whose lease expired to the pending tasks, and returns their number.
+        """
+        before = self._client.zcard(self._keys['leases'])
+        self.lease('', n=0, shards=[])
+        return before - self._client.zcard(self._keys['leases'])
+
+    def next_retry(self, shards=None):
+        """
+        Returns the time at which the next failed task can be leased again, or None
+        if no task is waiting for its backoff. Tasks of every shard are considered.
+        """
+        delayed = self._client.zrange(self._keys['delayed'], 0, 0, withscores=True)
+        return delayed[0][1] if delayed else None
+
+    def info(self):
+        """
+        Returns the number of pending, leased, done and failed tasks.
+        """
+        pipe = self._client.pipeline()
+        pipe.hlen(self._keys['tasks'])
+        pipe.zcard(self._keys['leases'])
+        pipe.get(self._keys['done'])
+        pipe.hlen(self._keys['failed'])
+        tasks, leased, done, failed = pipe.execute()
+        return {'pending': tasks - leased, 'leased': leased, 'done': int(done or 0), 'failed': failed}
+
+    def failures(self):
+        """
+        Returns the tasks that failed for good, with their last `error`.
+        """
+        failures = []
+        for id, data in self._client.hgetall(self._keys['failed']).items():
+            task = json.loads(data)
+            failures.append({**self._task(id.decode(), data, task['shard'], task['attempts']), 'error': task['error']})
+        return failures
+
+    def close(self):
+        self._client.close()
+
+    def _put(self, tasks):
+        keys = [self._keys[k] for k in ['tasks', 'pending:', 'leases', 'owners', 'failed']]
+        added = 0
+        # Scripts block the server, so large inputs are added in slices.
+        for i in range(0, len(tasks), 1000):
+            args = []
+            for id, shard, data in tasks[i:i + 1000]:
+                args.extend([id, shard, _encode({**json.loads(data), 'shard': shard, 'attempts': 0})])
+            added += self._put_script(keys, args)
+        return added
+
+    def _finish(self, worker, id, outcome, error):
+        keys = [self._keys[k] for k in ['tasks', 'pending:', 'leases', 'owners', 'failed', 'done', 'delayed']]
+        not_before = 0
+        if outcome == 'retry':
+            data = self._client.hget(self._keys['tasks'], id)
+            attempts = json.loads(data).get('attempts', 0) if data else 0
+            not_before = time.time() + _wrapper._wrapper._get_backoff(attempts)
+        return bool(self._finish_script(keys, [worker, id, outcome, error, self.max_attempts, not_before]))
+
+
+class QueueWorker:
+    """
+    Worker running the tasks of a work queue: it leases tasks of its shards, runs
+    up to `concurrency` of them at a time, heartbeats their leases while they run,
+    and completes (or fails) each one once its result was consumed.
+
+    Parameters
+    ----------
+    queue : SQLiteQueue or RedisQueue
+        The work queue.
+    node : tuple of (int, int), optional
+        Index and number of the nodes the shards are split between, e.g. (2, 8) for the third of
+        eight nodes (default is None, every shard).
+    steal : bool, optional
+        If True, tasks of other shards are leased once the shards of the node are empty (default is False).
+    concurrency : int, optional
+        Maximum number of requests in flight at the same time (default is 10).
+    wait : bool, optional
+        If True, the worker keeps polling an empty queue instead of stopping (default is False).
+    poll_interval : float, optional
+        Number of seconds between two polls of an empty queue (default is 1.0).
+    worker_id : str, optional
+        Id of the worker in the leases (default is the host name, process id and a random suffix).
+    **kwargs : dict
+        Keyword arguments passed to every call (e.g. throttle); task arguments take precedence.
+
+    Examples
+    --------
+    >>> queue = open_queue('redis://queue.local:6379/0')
+    >>> for task, result in QueueWorker(queue, node=(2, 8), concurrency=20).run():
+    ...     store(result)
+    """
+
+    def __init__(self, queue, node=None, steal=False, concurrency=10, wait=False, poll_interval=1.0, worker_id=None, **kwargs):
+        self.queue = queue
+        self.shards = None if node is None else queue.node_shards(*node)
+        self.steal = steal
+        self.concurrency = concurrency
+        self.wait = wait
+        self.poll_interval = poll_interval
+        self.worker_id = worker_id or '{}:{}:{}'.format(socket.gethostname(), os.getpid(), uuid.uuid4().hex[:8])
+        self.kwargs = kwargs
+        self.completed = 0
+        self.failed = 0
+        self._held = set()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def run(self):
+        """
+        Runs tasks until the queue is empty (or forever if `wait` is set).
+
+        Yields
+        ------
+        tuple of (dict, object or ScraperException)
+            The task and either the result of the call or the exception raised by it. The task is
+            only completed once the consumer asks for the next result, so that a worker killed
+            before storing a result leaves the task to be leased again.
+        """
+        heartbeat = threading.Thread(target=self._heartbeat, daemon=True)
+        heartbeat.start()
+        try:
+            # Each pass runs until no task can be leased; the next one picks up the retries.
+            ran = True
+            while ran and not self._stopped.is_set():
+                ran = False
+                for task, result in _scraper._map(self._call, self._get_tasks(), self.concurrency, False):
+                    ran = True
+                    if isinstance(result, ScraperException):
+                        logger.debug('Task {} failed: {}'.format(task['id'], result))
+                        yield task, result
+                        self.queue.fail(self.worker_id, task['id'], result, not isinstance(result, _PERMANENT))
+                        self.failed += 1
+                    else:
+                        yield task, result
+                        self.queue.complete(self.worker_id, task['id'])
+                        self.completed += 1
+                    with self._lock:
+                        self._held.discard(task['id'])
+        finally:
+            self._stopped.set()
+            heartbeat.join()
+
+    def stop(self):
+        """
+        Stops leasing tasks; the tasks already leased are run before `run` returns.
+        """
+        self._stopped.set()
+
+    def _call(self, task):
+        fn = getattr(_scraper, task['command'])
+        return fn(**{**self.kwargs, **task['params']})
+
+    def _get_tasks(self):
+        # Tasks are leased in batches as slots free up, from the shards of the node first.
+        while not self._stopped.is_set():
+            tasks = self.queue.lease(self.worker_id, self.concurrency, self.shards)
+            if not tasks and self.steal and self.shards is not None:
+                tasks = self.queue.lease(self.worker_id, self.concurrency)
+            if not tasks:
+                # Failed tasks come back once their backoff elapsed, waited for once nothing else runs.
+                with self._lock:
+                    running = bool(self._held)
+                retry = None if running else self.queue.next_retry(None if self.steal else self.shards)
+                if retry is None and not self.wait:
+                    return
+                delay = self.poll_interval if retry is None else max(retry - time.time(), 0)
+                self._stopped.wait(min(delay, self.poll_interval) if self.wait else delay)
+                continue
+            with self._lock:
+                self._held.update(x['id'] for x in tasks)
+            yield from tasks
+
+    def _heartbeat(self):
+        while not self._stopped.wait(self.queue.lease_time / 3):
+            with self._lock:
+                held = list(self._held)
+            if not held:
+                continue
+            try:
+                lost = set(held) - set(self.queue.heartbeat(self.worker_id, held))
+            except Exception as e:
+                logger.warning('Heartbeat of {} tasks failed: {}'.format(len(held), e))
+                continue
+            if lost:
+                logger.warning('Lost the lease of {} tasks.'.format(len(lost)))
+
+
+class _Transaction:
+
+    def __init__(self, connection, lock):
+        self.connection = connection
+        self.lock = lock
+
+    def __enter__(self):
+        self.lock.acquire()
+        self.connection.execute('BEGIN IMMEDIATE')
+        return self.connection
+
+    def __exit__(self, exc_type, *args):
+        try:
+            self.connection.execute('ROLLBACK' if exc_type else 'COMMIT')
+        finally:
+            self.lock.release()
+
+
+# Public module methods.
+def open_queue(url, **kwargs):
+    """
+    Opens a work queue from its URL.
+
+    Parameters
+    ----------
+    url : str
+        'redis://host:port/db' (or 'rediss://') for a Redis queue, otherwise the path of a
+        SQLite file, optionally prefixed with 'sqlite://'.
+    **kwargs : dict
+        Keyword arguments of the queue (e.g. shards, lease, max_attempts, and name for Redis).
+
+    Returns
+    -------
+    SQLiteQueue or RedisQueue
+        The work queue.
+    """
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisQueue(url, **kwargs)
+    if url.startswith('sqlite://'):
+        url = url[len('sqlite://'):]
+    return SQLiteQueue(url, **kwargs)
+
+# Private module methods.
+def _encode(value):
+    return json.dumps(value, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
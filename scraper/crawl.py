@@ -0,0 +1,444 @@
+import collections
+import hashlib
+import heapq
+import itertools
+import json
+import logging
+import math
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+import scraper.scraper as _scraper
+import scraper.wrapper as _wrapper
+from .exceptions import ScraperException
+
+logger = logging.getLogger('__main__')
+
+# Public module classes.
+class CrawlJob:
+    """
+    Long-running crawl that can be killed and restarted without losing progress.
+
+    Every completed or failed call, and the pagination token of every page of
+    reviews, is appended to a checkpoint log. When the job is restarted with the
+    same log, completed calls are skipped, failed calls are retried and review
+    pagination resumes from the last stored token.
+
+    Parameters
+    ----------
+    path : str
+        Path of the checkpoint log (one JSON entry per line), created if missing.
+    sync_every : int, optional
+        Number of entries after which the log is flushed and fsynced (default is 1000).
+    sync_interval : float, optional
+        Maximum number of seconds between two fsyncs while entries are written (default is 1.0).
+
+    Examples
+    --------
+    >>> with CrawlJob('crawl.log') as job:
+    ...     for row, apps in job.run('list', [{'collection': 'TOP_FREE', 'num': 500}]):
+    ...         appIds = [x['appId'] for x in apps]
+    ...     for row, details in job.run('app', appIds, concurrency=20):
+    ...         store(details)
+    ...     for appId in appIds:
+    ...         for review in job.iter_reviews(appId):
+    ...             store(review)
+    """
+
+    def __init__(self, path, sync_every=1000, sync_interval=1.0):
+        self.path = path
+        self.completed = set()
+        self.failed = {}
+        self.tokens = {}
+        self._replay()
+        self._log = _CheckpointLog(path, sync_every, sync_interval)
+
+    def key(self, command, row):
+        """
+        Returns the checkpoint key of a call, its function name and sorted arguments.
+        """
+        return '{}:{}'.format(command, json.dumps(row, sort_keys=True, separators=(',', ':')))
+
+    def run(self, command, items, concurrency=10, ordered=False, **kwargs):
+        """
+        Calls a scraper function for every item that was not completed by a previous run.
+
+        Parameters
+        ----------
+        command : str
+            Name of the scraper function to call (e.g. 'app', 'datasafety').
+        items : iterable of str or dict
+            Ids (passed as the first argument of the function) or keyword arguments of each call.
+        concurrency : int, optional
+            Maximum number of requests in flight at the same time (default is 10).
+        ordered : bool, optional
+            If True, results are yielded in the order of `items` (default is False).
+        **kwargs : dict
+            Keyword arguments shared by every call; they are not part of the checkpoint key.
+
+        Yields
+        ------
+        tuple of (dict, object or ScraperException)
+            The row and either the result of the call or the exception raised by it. A call
+            is only checkpointed as completed once the consumer asks for the next result.
+        """
+        keys = _wrapper._Wrapper.api_keys[command]
+        rows = (x if isinstance(x, dict) else {keys[0]: x} for x in items)
+        rows = (x for x in rows if self.key(command, x) not in self.completed)
+        for row, result in _scraper.batch(command, rows, concurrency, ordered, **kwargs):
+            key = self.key(command, row)
+            if isinstance(result, ScraperException):
+                self._log.write({'key': key, 'status': 'failed', 'error': str(result)})
+                self.failed[key] = str(result)
+                yield row, result
+                continue
+            yield row, result
+            self._complete(key)
+
+    def iter_reviews(self, appId, **kwargs):
+        """
+        Lazily iterates over the reviews of an application, resuming from the page
+        reached by a previous run. Reviews of that page are yielded again.
+
+        Parameters
+        ----------
+        appId : str
+            The Google Play id of the application.
+        **kwargs : dict
+            Keyword arguments forwarded to `scraper.iter_reviews` (e.g. lang, country, sort, max_reviews).
+
+        Yields
+        ------
+        dict
+            The reviews of the application.
+        """
+        row = {'appId': appId, **{k: v for k, v in kwargs.items() if k in ['lang', 'country', 'sort']}}
+        key = self.key('reviews', row)
+        if key in self.completed:
+            return
+
+        token = self.tokens.get(key)
+        reviews = _scraper.iter_reviews(appId, nextPaginationToken=token, **kwargs)
+        for review in reviews:
+            if reviews.nextPaginationToken != token:
+                token = reviews.nextPaginationToken
+                self._log.write({'key': key, 'status': 'token', 'token': token})
+                self.tokens[key] = token
+            yield review
+        self._complete(key)
+
+    def close(self):
+        """
+        Flushes and fsyncs the checkpoint log, then closes it.
+        """
+        self._log.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _complete(self, key):
+        self._log.write({'key': key, 'status': 'completed'})
+        self.completed.add(key)
+        self.failed.pop(key, None)
+        self.tokens.pop(key, None)
+
+    def _replay(self):
+        try:
+            f = open(self.path)
+        except FileNotFoundError:
+            return
+        with f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.decoder.JSONDecodeError:
+                    # The last line may have been cut short by a crash.
+                    continue
+                key, status = entry['key'], entry['status']
+                if status == 'completed':
+                    self.completed.add(key)
+                    self.failed.pop(key, None)
+                    self.tokens.pop(key, None)
+                elif status == 'failed':
+                    self.failed[key] = entry.get('error')
+                elif status == 'token':
+                    self.tokens[key] = entry['token']
+
+
+class DiscoveryCrawler:
+    """
+    Breadth-first discovery of the catalog, starting from the lists of every
+    category and collection (or from given applications) and expanding each
+    application found to its similar applications and to the other applications
+    of its developer.
+
+    Every application is yielded and expanded at most once per run, and every
+    developer listed once, thanks to an index of visited ids: a set of 64-bit
+    hashes that spills to a SQLite file past `capacity` entries, or a Bloom filter
+    sized for `capacity` entries when memory matters more than exactness (a false
+    positive skips an application). Applications waiting to be expanded are kept
+    in a frontier ordered by depth, then by `priority`.
+
+    Parameters
+    ----------
+    categories : list of str, optional
+        Categories listed to seed the crawl (default is every category, or none if `seeds` are given).
+    collections : list of str, optional
+        Collections listed for each category (default is every collection, or none if `seeds` are given).
+    seeds : list of str, optional
+        Ids of applications the crawl starts from, on top of the lists (default is no application).
+    expand : list of {'similar', 'developer'}, optional
+        Calls used to expand each discovered application (default is both).
+    max_depth : int, optional
+        Number of expansions between a seed and the applications found (default is 2).
+        Seeds and the applications of the lists have a depth of 0.
+    max_apps : int, optional
+        Number of applications after which the crawl stops (default is None, no limit).
+    max_calls : int, optional
+        Number of scraper calls after which no more calls are made (default is None, no limit).
+    concurrency : int, optional
+        Maximum number of requests in flight at the same time (default is 10).
+    priority : callable, optional
+        Function of an application record returning its priority; at equal depth, applications
+        with a higher priority are expanded first (default is the score of the application).
+    index : {'set', 'bloom'}, optional
+        Index of the visited ids (default is 'set').
+    index_path : str, optional
+        SQLite file the 'set' index spills to (default is None, a temporary file).
+    capacity : int, optional
+        Number of ids the 'set' index keeps in memory, or the 'bloom' index is sized for
+        (default is 1,000,000 for 'set' and 10,000,000 for 'bloom').
+    **kwargs : dict
+        Keyword arguments passed to every call (e.g. lang, country, num, throttle).
+
+    Examples
+    --------
+    >>> crawler = DiscoveryCrawler(categories=['GAME'], max_depth=1, max_calls=1000)
+    >>> for app, depth in crawler.run():
+    ...     store(app)
+    """
+
+    def __init__(self, categories=None, collections=None, seeds=(), expand=('similar', 'developer'),
+                 max_depth=2, max_apps=None, max_calls=None, concurrency=10, priority=None,
+                 index='set', index_path=None, capacity=None, **kwargs):
+        if index == 'set':
+            self.visited = _VisitedSet(index_path, capacity or 1000000)
+        elif index == 'bloom':
+            self.visited = _BloomFilter(capacity or 10000000)
+        else:
+            raise ValueError('Unknown visited index: {}.'.format(index))
+        self.categories = categories
+        self.collections = collections
+        self.seeds = list(seeds)
+        self.expand = list(expand)
+        self.max_depth = max_depth
+        self.max_apps = max_apps
+        self.max_calls = max_calls
+        self.concurrency = concurrency
+        self.priority = priority or (lambda app: app.get('score') or 0)
+        # A projection keeps the fields the crawl itself needs, which are left out of its output.
+        self.fields = kwargs.get('fields')
+        if self.fields is not None:
+            self.fields = list(self.fields)
+            needed = ['appId', 'developer', 'developerId', 'score']
+            kwargs['fields'] = list(kwargs['fields']) + [x for x in needed if x not in kwargs['fields']]
+        self.kwargs = kwargs
+        self.calls = 0
+        self.failed = 0
+        self.apps = 0
+
+    def run(self):
+        """
+        Runs the crawl.
+
+        Yields
+        ------
+        tuple of (dict, int)
+            Each application discovered, as returned by `list`, `similar` or `developer`
+            (or `app` for seeds), and its depth.
+        """
+        frontier, sequence = [], itertools.count()
+        tasks = collections.deque(self._get_seed_tasks())
+        while tasks or frontier:
+            # Yield everything found so far, queuing the expansions by priority.
+            while frontier:
+                depth, _, _, app = heapq.heappop(frontier)
+                yield self._project(app), depth
+                self.apps += 1
+                if self.max_apps is not None and self.apps >= self.max_apps:
+                    return
+                if depth < self.max_depth:
+                    tasks.extend(self._get_expand_tasks(app, depth + 1))
+
+            wave = []
+            while tasks and len(wave) < self.concurrency * 4 and not self._over_budget():
+                wave.append(tasks.popleft())
+                self.calls += 1
+            if not wave:
+                return
+
+            for (command, row, depth), result in _scraper._map(self._call, wave, self.concurrency, False):
+                if isinstance(result, ScraperException):
+                    logger.debug('Failed {} {}: {}'.format(command, row, result))
+                    self.failed += 1
+                    continue
+                for app in [result] if isinstance(result, dict) else result:
+                    if isinstance(app, dict) and 'appId' in app and self.visited.add(app['appId']):
+                        heapq.heappush(frontier, (depth, -self.priority(app), next(sequence), app))
+
+    def close(self):
+        """
+        Closes the visited index, removing its temporary spill file.
+        """
+        self.visited.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _call(self, task):
+        command, row, depth = task
+        return getattr(_scraper, command)(**{**self.kwargs, **row})
+
+    def _project(self, app):
+        if self.fields is None:
+            return app
+        return {k: v for k, v in app.items() if k in self.fields}
+
+    def _over_budget(self):
+        return self.max_calls is not None and self.calls >= self.max_calls
+
+    def _get_seed_tasks(self):
+        tasks = [('app', {'appId': x}, 0) for x in self.seeds]
+        categories, collections = self.categories, self.collections
+        if not self.seeds:
+            categories = _wrapper.category.values() if categories is None else categories
+            collections = _wrapper.collection.values() if collections is None else collections
+        for category in categories or []:
+            for collection in collections or []:
+                tasks.append(('list', {'category': category, 'collection': collection}, 0))
+        return tasks
+
+    def _get_expand_tasks(self, app, depth):
+        tasks = []
+        if 'similar' in self.expand:
+            tasks.append(('similar', {'appId': app['appId']}, depth))
+        developer = app.get('developerId') or app.get('developer')
+        if 'developer' in self.expand and developer and self.visited.add('developer:' + str(developer)):
+            tasks.append(('developer', {'devId': developer}, depth))
+        return tasks
+
+
+# Private module classes.
+class _CheckpointLog:
+
+    def __init__(self, path, sync_every=1000, sync_interval=1.0):
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self._file = open(path, 'a')
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def write(self, entry):
+        # Entries are batched so that fsync is not paid for every item.
+        with self._lock:
+            self._file.write(json.dumps(entry) + '\n')
+            self._unsynced += 1
+            if (self._unsynced >= self.sync_every
+                    or time.monotonic() - self._synced_at >= self.sync_interval):
+                self._sync()
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._sync()
+                self._file.close()
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+
+
+class _VisitedSet:
+
+    def __init__(self, path=None, capacity=1000000):
+        # Ids are stored as 64-bit hashes, a fraction of the size of the strings.
+        self.capacity = capacity
+        self.path = path
+        self._memory = set()
+        self._db = None
+        self._temporary = path is None
+
+    def add(self, key):
+        # Returns True if the key was not visited yet.
+        digest = _hash(key)
+        if digest in self._memory:
+            return False
+        if self._db is not None:
+            cursor = self._db.execute('INSERT OR IGNORE INTO visited VALUES (?)', (digest,))
+            return cursor.rowcount == 1
+        self._memory.add(digest)
+        if len(self._memory) >= self.capacity:
+            self._spill()
+        return True
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+        if self._temporary and self.path is not None and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def _spill(self):
+        if self.path is None:
+            fd, self.path = tempfile.mkstemp(prefix='scraper-visited-', suffix='.sqlite3')
+            os.close(fd)
+        logger.debug('Spilling the visited index to {}.'.format(self.path))
+        self._db = sqlite3.connect(self.path, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=OFF')
+        self._db.execute('PRAGMA synchronous=OFF')
+        self._db.execute('CREATE TABLE IF NOT EXISTS visited (hash INTEGER PRIMARY KEY)')
+        self._db.executemany('INSERT OR IGNORE INTO visited VALUES (?)', ((x,) for x in self._memory))
+        self._memory = set()
+
+
+class _BloomFilter:
+
+    def __init__(self, capacity=10000000, error_rate=0.001):
+        # Optimal number of bits and hash functions for the capacity and error rate.
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def add(self, key):
+        # Returns True if the key was (most likely) not visited yet.
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        added = False
+        for i in range(self.hashes):
+            bit = (h1 + i * h2) % self.size
+            byte, mask = bit >> 3, 1 << (bit & 7)
+            if not self._bits[byte] & mask:
+                self._bits[byte] |= mask
+                added = True
+        return added
+
+    def close(self):
+        pass
+
+
+# Private module methods.
+def _hash(key):
+    # Signed, so that it fits an SQLite integer.
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little', signed=True)
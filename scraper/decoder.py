@@ -0,0 +1,70 @@
+import json
+import logging
+import time
+
+# Optional faster decoders, used in this order when installed.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import simdjson
+except ImportError:
+    simdjson = None
+
+logger = logging.getLogger('__main__')
+
+# Number of records of a list result the Node worker writes per line.
+CHUNK_SIZE = 100
+
+# Decoder of the worker output; every backend accepts bytes, so lines are never decoded to str first.
+if orjson is not None:
+    BACKEND, loads = 'orjson', orjson.loads
+elif simdjson is not None:
+    BACKEND, loads = 'simdjson', simdjson.loads
+else:
+    BACKEND, loads = 'json', json.loads
+
+# Private module classes.
+class _Assembler:
+    """
+    Decodes the lines written by a Node worker, straight from bytes.
+
+    List results (and the `data` list of a page of reviews) are written in
+    `partial` lines of CHUNK_SIZE records, followed by the response itself, so
+    records are decoded as soon as the worker writes them instead of once the
+    whole payload is buffered as a single multi-megabyte line.
+    """
+
+    def __init__(self):
+        self._partial = {}
+        self._stats = {}
+        # Bytes and decoding seconds of the last complete response.
+        self.stats = (0, 0.0)
+
+    def feed(self, line):
+        # Returns the complete response, or None for partial and unrecognized lines.
+        start = time.perf_counter()
+        try:
+            message = loads(line)
+        except ValueError:
+            logger.debug('Ignoring worker output: {}'.format(line))
+            return None
+        if not isinstance(message, dict):
+            return None
+        size, seconds = self._stats.pop(message.get('id'), (0, 0.0))
+        size, seconds = size + len(line), seconds + time.perf_counter() - start
+        if 'partial' in message:
+            self._partial.setdefault(message.get('id'), []).extend(message['partial'])
+            self._stats[message.get('id')] = (size, seconds)
+            return None
+
+        items = self._partial.pop(message.get('id'), None)
+        if items is not None:
+            result = message.get('result')
+            if isinstance(result, dict):
+                result['data'] = items + result.get('data', [])
+            else:
+                message['result'] = items + (result or [])
+        self.stats = (size, seconds)
+        return message
@@ -1,2 +1,45 @@
 class ScraperException(Exception):
+
+    def __init__(self, message=None, status=None, code=None):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+
+class NotFoundException(ScraperException):
+    """The requested application, developer or page does not exist (HTTP 404)."""
     pass
+
+class ParseException(ScraperException):
+    """The response could not be parsed, e.g. because Google Play changed its markup."""
+    pass
+
+class TransientException(ScraperException):
+    """A temporary failure (network error, server error, timeout) that is worth retrying."""
+    pass
+
+class RateLimitedException(TransientException):
+    """Google Play is throttling the requests (HTTP 429 or 503)."""
+    pass
+
+# Node.js error codes of network failures, and of a crashed Node worker.
+_TRANSIENT_CODES = [
+    'ECONNRESET', 'ECONNREFUSED', 'ECONNABORTED', 'ETIMEDOUT',
+    'ESOCKETTIMEDOUT', 'EAI_AGAIN', 'EPIPE', 'ENETUNREACH', 'EHOSTUNREACH',
+    'EWORKER'
+]
+
+# Private module methods.
+def _from_error(error):
+    # Builds the exception matching a structured error payload of the Node worker.
+    message, status, code = error.get('message'), error.get('status'), error.get('code')
+    if status == 404:
+        cls = NotFoundException
+    elif status in [429, 503]:
+        cls = RateLimitedException
+    elif (status is not None and status >= 500) or code in _TRANSIENT_CODES:
+        cls = TransientException
+    elif error.get('name') in ['TypeError', 'SyntaxError', 'RangeError']:
+        cls = ParseException
+    else:
+        cls = ScraperException
+    return cls(message, status=status, code=code)
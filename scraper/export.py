@@ -0,0 +1,164 @@
+import datetime
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# Number of records buffered before they are converted to a columnar batch.
+ROW_GROUP_SIZE = 65536
+
+# Private module classes.
+class _Columns:
+
+    def __init__(self, endpoint, batch_size=ROW_GROUP_SIZE):
+        self.schema = _get_schema(endpoint)
+        self.batch_size = batch_size
+        self._converters = {k: v for k, v in _converters.items() if k in self.schema.names}
+        self._reset()
+
+    def append(self, record):
+        # Records are dicts or scraper.models records, which both support get().
+        for name, column in self._columns.items():
+            value = record.get(name)
+            if value is not None and name in self._converters:
+                value = self._converters[name](value)
+            column.append(value)
+        self.size += 1
+
+    def flush(self):
+        batch = pyarrow.RecordBatch.from_pydict(self._columns, schema=self.schema)
+        self._reset()
+        return batch
+
+    def _reset(self):
+        self._columns = {name: [] for name in self.schema.names}
+        self.size = 0
+
+
+class _ParquetWriter:
+
+    def __init__(self, path, endpoint, compression='zstd', row_group_size=ROW_GROUP_SIZE):
+        self._columns = _Columns(endpoint, row_group_size)
+        self._writer = pyarrow.parquet.ParquetWriter(
+            path, self._columns.schema, compression=compression or 'none')
+
+    def write_all(self, records):
+        for record in records:
+            self.write(record)
+
+    def write(self, record):
+        self._columns.append(record)
+        if self._columns.size >= self._columns.batch_size:
+            self._writer.write_batch(self._columns.flush())
+
+    def close(self):
+        if self._columns.size:
+            self._writer.write_batch(self._columns.flush())
+        self._writer.close()
+
+
+# Public module methods.
+def to_arrow(records, endpoint='app', batch_size=ROW_GROUP_SIZE):
+    """
+    Builds an Arrow table from scraper results, without materializing a list of the records.
+
+    Parameters
+    ----------
+    records : iterable of dict
+        The records, e.g. the result of `list` or an `iter_reviews` iterator.
+    endpoint : {'app', 'list', 'search', 'developer', 'similar', 'reviews', 'permissions', 'datasafety'}, optional
+        The function that returned the records, which selects the fixed schema of the table (default is 'app').
+    batch_size : int, optional
+        Number of records converted at once (default is 65536).
+
+    Returns
+    -------
+    pyarrow.Table
+        The records, with the columns of the endpoint's schema. Fields outside of the schema are dropped.
+    """
+    columns = _Columns(endpoint, batch_size)
+    batches = []
+    for record in records:
+        columns.append(record)
+        if columns.size >= batch_size:
+            batches.append(columns.flush())
+    if columns.size or not batches:
+        batches.append(columns.flush())
+    return pyarrow.Table.from_batches(batches, schema=columns.schema)
+
+def write_parquet(records, path, endpoint='app', compression='zstd', row_group_size=ROW_GROUP_SIZE):
+    """
+    Streams scraper results to a Parquet file, one row group at a time.
+
+    Parameters
+    ----------
+    records : iterable of dict
+        The records, e.g. the result of `list` or an `iter_reviews` iterator.
+    path : str
+        The Parquet file to write.
+    endpoint : {'app', 'list', 'search', 'developer', 'similar', 'reviews', 'permissions', 'datasafety'}, optional
+        The function that returned the records, which selects the fixed schema of the file (default is 'app').
+    compression : str, optional
+        The Parquet compression codec, e.g. 'zstd', 'gzip', 'snappy' or None (default is 'zstd').
+    row_group_size : int, optional
+        Number of records per row group, which bounds the memory used while writing (default is 65536).
+    """
+    writer = _ParquetWriter(path, endpoint, compression, row_group_size)
+    try:
+        writer.write_all(records)
+    finally:
+        writer.close()
+
+# Private module methods.
+def _get_schema(endpoint):
+    if pyarrow is None:
+        raise ImportError('Columnar export requires the pyarrow package.')
+    string, integer, double, boolean = pyarrow.string(), pyarrow.int64(), pyarrow.float64(), pyarrow.bool_()
+    timestamp = pyarrow.timestamp('ms', tz='UTC')
+
+    if endpoint in ['app', 'list', 'search', 'developer', 'similar']:
+        return pyarrow.schema([
+            ('appId', string), ('title', string), ('url', string), ('icon', string),
+            ('developer', string), ('developerId', string), ('developerEmail', string),
+            ('developerWebsite', string), ('summary', string), ('description', string),
+            ('genre', string), ('genreId', string), ('score', double), ('scoreText', string),
+            ('ratings', integer), ('reviews', integer), ('installs', string),
+            ('minInstalls', integer), ('maxInstalls', integer), ('free', boolean),
+            ('price', double), ('currency', string), ('offersIAP', boolean),
+            ('adSupported', boolean), ('contentRating', string), ('androidVersion', string),
+            ('version', string), ('released', string), ('updated', timestamp),
+            ('privacyPolicy', string), ('screenshots', pyarrow.list_(string)),
+        ])
+    if endpoint == 'reviews':
+        return pyarrow.schema([
+            ('id', string), ('userName', string), ('userImage', string), ('date', timestamp),
+            ('score', integer), ('scoreText', string), ('url', string), ('title', string),
+            ('text', string), ('replyDate', timestamp), ('replyText', string),
+            ('version', string), ('thumbsUp', integer),
+        ])
+    if endpoint == 'permissions':
+        return pyarrow.schema([('permission', string), ('type', string)])
+    if endpoint == 'datasafety':
+        data = pyarrow.list_(pyarrow.struct([
+            ('data', string), ('optional', boolean), ('purpose', string), ('type', string)]))
+        practices = pyarrow.list_(pyarrow.struct([('practice', string), ('description', string)]))
+        return pyarrow.schema([
+            ('appId', string), ('sharedData', data), ('collectedData', data),
+            ('securityPractices', practices), ('privacyPolicyUrl', string),
+        ])
+    raise ValueError('No columnar schema for {}.'.format(endpoint))
+
+def _parse_timestamp(value):
+    # Reviews carry ISO 8601 dates, app details epoch milliseconds.
+    if isinstance(value, str):
+        return datetime.datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return datetime.datetime.fromtimestamp(value / 1000, tz=datetime.timezone.utc)
+
+# Private module attributes.
+_converters = {
+    'updated': _parse_timestamp,
+    'date': _parse_timestamp,
+    'replyDate': _parse_timestamp,
+}
@@ -0,0 +1,80 @@
+import collections
+import hashlib
+import json
+
+# Public module methods.
+def split_locales(records):
+    """
+    Splits the records of one application in several locales into a shared base
+    record and per-locale deltas.
+
+    Each field of the base holds the value most locales agree on. Each distinct
+    response is content hashed and its delta (the fields that differ from the
+    base) is stored once, however many locales returned it.
+
+    Parameters
+    ----------
+    records : dict of {str: dict}
+        The records of the application, by locale.
+
+    Returns
+    -------
+    dict
+        Dictionary with the `base` record, the `deltas` by content hash, and the content
+        hash of each of the `locales`. A delta lists the fields the locale lacks under `missing`.
+    """
+    encoded = {
+        locale: {k: _encode(v) for k, v in record.items()}
+        for locale, record in records.items()
+    }
+
+    # The base value of each field is the one shared by most locales.
+    votes = collections.defaultdict(collections.Counter)
+    for fields in encoded.values():
+        for k, v in fields.items():
+            votes[k][v] += 1
+    base_encoded = {k: counter.most_common(1)[0][0] for k, counter in votes.items()}
+    base = {}
+    for locale, record in records.items():
+        for k, v in record.items():
+            if k not in base and encoded[locale][k] == base_encoded[k]:
+                base[k] = v
+
+    deltas, locales = {}, {}
+    for locale, record in records.items():
+        digest = hashlib.sha1(_encode(record).encode()).hexdigest()
+        locales[locale] = digest
+        if digest in deltas:
+            continue
+        delta = {k: v for k, v in record.items() if encoded[locale][k] != base_encoded[k]}
+        missing = [k for k in base if k not in record]
+        if missing:
+            delta['missing'] = missing
+        deltas[digest] = delta
+    return {'base': base, 'deltas': deltas, 'locales': locales}
+
+def join_locale(result, locale):
+    """
+    Rebuilds the full record of one locale from the result of `split_locales` or `app_locales`.
+
+    Parameters
+    ----------
+    result : dict
+        The base record, deltas and locales.
+    locale : str
+        The locale to rebuild (e.g. 'de-DE').
+
+    Returns
+    -------
+    dict
+        The record of the application in that locale.
+    """
+    delta = dict(result['deltas'][result['locales'][locale]])
+    missing = delta.pop('missing', [])
+    record = {k: v for k, v in result['base'].items() if k not in missing}
+    record.update(delta)
+    return record
+
+# Private module methods.
+def _encode(value):
+    return json.dumps(value, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
@@ -0,0 +1,202 @@
+import collections
+import logging
+import socket
+import threading
+
+logger = logging.getLogger('__main__')
+
+# Upper bounds in seconds of the latency histogram buckets.
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, float('inf'))
+
+# Counters and timings recorded for each endpoint.
+COUNTERS = ('calls', 'errors', 'retries', 'cache_hits', 'memo_hits', 'bytes_sent', 'bytes_received')
+TIMINGS = {
+    'call': 'whole call, including the cache, memo, rate limits and retries',
+    'request': 'round trip of a request to the Node worker',
+    'node': 'time spent by the Node worker in the google-play-scraper function',
+    'decode': 'time spent decoding the response in Python',
+    'startup': 'time to start a Node worker and load the google-play-scraper module',
+}
+
+# Private module classes.
+class _Histogram:
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[next(i for i, x in enumerate(BUCKETS) if value <= x)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        # Upper bound of the bucket holding the quantile, capped by the largest value.
+        rank, seen = q * self.count, 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if seen >= rank and count:
+                return min(bound, self.max)
+        return self.max
+
+    def info(self):
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'max': self.max,
+            'p50': self.quantile(0.5),
+            'p99': self.quantile(0.99),
+            'buckets': dict(zip(BUCKETS, self.counts)),
+        }
+
+
+class _Metrics:
+    """
+    Counters and latency histograms by endpoint, shared by the synchronous and
+    asyncio APIs. Every recorded value is also passed to the registered hooks,
+    as hook(kind, endpoint, name, value) where kind is 'count' or 'timing'.
+    """
+
+    def __init__(self):
+        self.hooks = []
+        self._lock = threading.Lock()
+        self.clear()
+
+    def count(self, endpoint, name, value=1):
+        with self._lock:
+            self._counters[endpoint][name] += value
+        self._emit('count', endpoint, name, value)
+
+    def observe(self, endpoint, name, seconds):
+        with self._lock:
+            self._timings[endpoint][name].observe(seconds)
+        self._emit('timing', endpoint, name, seconds)
+
+    def clear(self):
+        with self._lock:
+            self._counters = collections.defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+            self._timings = collections.defaultdict(lambda: collections.defaultdict(_Histogram))
+
+    def info(self):
+        with self._lock:
+            endpoints = sorted(set(self._counters) | set(self._timings))
+            return {
+                endpoint: {
+                    **self._counters.get(endpoint, dict.fromkeys(COUNTERS, 0)),
+                    'timings': {k: v.info() for k, v in self._timings.get(endpoint, {}).items()},
+                }
+                for endpoint in endpoints
+            }
+
+    def prometheus(self, prefix='scraper'):
+        # Text exposition format of Prometheus.
+        lines = []
+        info = self.info()
+        for name in COUNTERS:
+            metric = '{}_{}_total'.format(prefix, name)
+            lines.append('# TYPE {} counter'.format(metric))
+            for endpoint, values in info.items():
+                lines.append('{}{{endpoint="{}"}} {}'.format(metric, endpoint, values[name]))
+        for name, description in TIMINGS.items():
+            metric = '{}_{}_seconds'.format(prefix, name)
+            lines.append('# HELP {} Duration of the {}.'.format(metric, description))
+            lines.append('# TYPE {} histogram'.format(metric))
+            for endpoint, values in info.items():
+                histogram = values['timings'].get(name)
+                if histogram is None:
+                    continue
+                seen = 0
+                for bound, count in histogram['buckets'].items():
+                    seen += count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append('{}_bucket{{endpoint="{}",le="{}"}} {}'.format(metric, endpoint, le, seen))
+                lines.append('{}_sum{{endpoint="{}"}} {}'.format(metric, endpoint, histogram['sum']))
+                lines.append('{}_count{{endpoint="{}"}} {}'.format(metric, endpoint, histogram['count']))
+        return '\n'.join(lines) + '\n'
+
+    def summary(self):
+        # Human readable table, one line per endpoint and timing.
+        lines = ['{:<12} {:>7} {:>6} {:>7} {:>6} {:>6} {:>10} {:>10}'.format(
+            'endpoint', 'calls', 'errors', 'retries', 'cache', 'memo', 'sent', 'received')]
+        timings = []
+        for endpoint, values in self.info().items():
+            if any(values[x] for x in COUNTERS):
+                lines.append('{:<12} {:>7} {:>6} {:>7} {:>6} {:>6} {:>10} {:>10}'.format(
+                    endpoint, values['calls'], values['errors'], values['retries'], values['cache_hits'],
+                    values['memo_hits'], _format_bytes(values['bytes_sent']),
+                    _format_bytes(values['bytes_received'])))
+            for name, histogram in values['timings'].items():
+                timings.append('{:<12} {:<8} {:>7} {:>10.1f} {:>10.1f} {:>10.1f} {:>10.1f}'.format(
+                    endpoint, name, histogram['count'], histogram['sum'] / histogram['count'] * 1000,
+                    histogram['p50'] * 1000, histogram['p99'] * 1000, histogram['max'] * 1000))
+        if timings:
+            lines.append('')
+            lines.append('{:<12} {:<8} {:>7} {:>10} {:>10} {:>10} {:>10}'.format(
+                'endpoint', 'timing', 'count', 'mean ms', 'p50 ms', 'p99 ms', 'max ms'))
+            lines.extend(timings)
+        return '\n'.join(lines)
+
+    def _emit(self, kind, endpoint, name, value):
+        for hook in self.hooks:
+            try:
+                hook(kind, endpoint, name, value)
+            except Exception as e:
+                logger.debug('Metrics hook {!r} failed: {}'.format(hook, e))
+
+
+# Public module classes.
+class StatsdHook:
+    """
+    Metrics hook sending every recorded value to a StatsD server over UDP, as
+    `<prefix>.<endpoint>.<name>` counters and millisecond timers.
+
+    Parameters
+    ----------
+    host : str, optional
+        The StatsD server (default is '127.0.0.1').
+    port : int, optional
+        The UDP port of the StatsD server (default is 8125).
+    prefix : str, optional
+        Prefix of every metric name (default is 'scraper').
+
+    Examples
+    --------
+    >>> scraper.add_metrics_hook(scraper.metrics.StatsdHook('statsd.local'))
+    """
+
+    def __init__(self, host='127.0.0.1', port=8125, prefix='scraper'):
+        self.address = (host, port)
+        self.prefix = prefix
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def __call__(self, kind, endpoint, name, value):
+        if kind == 'timing':
+            line = '{}.{}.{}:{:.3f}|ms'.format(self.prefix, endpoint, name, value * 1000)
+        else:
+            line = '{}.{}.{}:{}|c'.format(self.prefix, endpoint, name, value)
+        self._socket.sendto(line.encode(), self.address)
+
+    def close(self):
+        self._socket.close()
+
+
+# Private module methods.
+def _record_request(metrics, method, sent, seconds, response, stats):
+    # Records a round trip to a Node worker, given the (bytes, decoding seconds) of its response.
+    received, decode = stats
+    metrics.count(method, 'bytes_sent', sent)
+    metrics.count(method, 'bytes_received', received)
+    metrics.observe(method, 'request', seconds)
+    metrics.observe(method, 'decode', decode)
+    if response.get('elapsed') is not None:
+        metrics.observe(method, 'node', response['elapsed'] / 1000)
+
+def _format_bytes(size):
+    for unit in ['B', 'KiB', 'MiB']:
+        if size < 1024:
+            return '{:.0f} {}'.format(size, unit) if unit == 'B' else '{:.1f} {}'.format(size, unit)
+        size /= 1024
+    return '{:.1f} GiB'.format(size)
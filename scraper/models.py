@@ -0,0 +1,129 @@
+import json
+
+# Private module classes.
+class _Record:
+    """
+    Compact, read-only view of a scraper result.
+
+    The commonly used fields are stored in slots. Every other field (large ones
+    like `descriptionHTML`, `screenshots` or `comments`, and any field added by
+    future versions of the Node module) is kept as a single UTF-8 encoded JSON
+    blob and only decoded when accessed. Records also support `record['field']`
+    and `record.get('field')`, so code written against dicts keeps working.
+    """
+
+    __slots__ = ('_extra',)
+    fields = ()
+
+    def __init__(self, data):
+        # Fields missing from the response are left unset, as keys missing from a dict.
+        for field in self.fields:
+            if field in data:
+                setattr(self, field, data[field])
+        extra = {k: v for k, v in data.items() if k not in self.fields}
+        self._extra = json.dumps(extra, separators=(',', ':')).encode() if extra else None
+
+    def __getattr__(self, name):
+        # Only called for lazy fields, which are decoded on every access.
+        if name.startswith('_') or self._extra is None:
+            raise AttributeError(name)
+        extra = json.loads(self._extra)
+        if name not in extra:
+            raise AttributeError(name)
+        return extra[name]
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def to_dict(self):
+        data = {}
+        for field in self.fields:
+            try:
+                data[field] = object.__getattribute__(self, field)
+            except AttributeError:
+                pass
+        if self._extra is not None:
+            data.update(json.loads(self._extra))
+        return data
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        key = self.fields[0]
+        return '{}({}={!r})'.format(type(self).__name__, key, self.get(key))
+
+    def __getstate__(self):
+        return self.to_dict()
+
+    def __setstate__(self, state):
+        self.__init__(state)
+
+
+# Public module classes.
+class App(_Record):
+    """Details of an application, as returned by `app`, `list`, `search`, `developer` and `similar`."""
+
+    fields = (
+        'appId', 'title', 'url', 'icon', 'developer', 'developerId', 'summary',
+        'genre', 'genreId', 'score', 'scoreText', 'ratings', 'reviews', 'installs',
+        'minInstalls', 'maxInstalls', 'free', 'price', 'currency', 'offersIAP',
+        'adSupported', 'contentRating', 'androidVersion', 'version', 'released',
+        'updated', 'privacyPolicy'
+    )
+    __slots__ = fields
+
+
+class Review(_Record):
+    """A review, as returned in the `data` list of `reviews`."""
+
+    fields = (
+        'id', 'userName', 'date', 'score', 'title', 'text',
+        'replyDate', 'replyText', 'version', 'thumbsUp'
+    )
+    __slots__ = fields
+
+
+class Permission(_Record):
+    """A permission of an application, as returned by `permissions`."""
+
+    fields = ('permission', 'type')
+    __slots__ = fields
+
+
+class DataSafety(_Record):
+    """The data safety section of an application, as returned by `datasafety`."""
+
+    fields = ('sharedData', 'collectedData', 'securityPractices', 'privacyPolicyUrl')
+    __slots__ = fields
+
+
+# Private module attributes.
+_models = {
+    'app': App,
+    'list': App,
+    'search': App,
+    'developer': App,
+    'similar': App,
+    'reviews': Review,
+    'permissions': Permission,
+    'datasafety': DataSafety,
+}
+
+# Private module methods.
+def _convert(fn_name, output):
+    # Converts the dicts of a response to records, leaving other values as is.
+    model = _models.get(fn_name)
+    if model is None:
+        return output
+    if isinstance(output, list):
+        return [model(x) if isinstance(x, dict) else x for x in output]
+    if fn_name == 'reviews' and isinstance(output, dict):
+        return {**output, 'data': _convert(fn_name, output.get('data', []))}
+    return model(output) if isinstance(output, dict) else output
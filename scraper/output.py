@@ -0,0 +1,152 @@
+import abc
+import csv
+import gzip
+import io
+import json
+import sys
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+import scraper.export as _export
+
+FORMATS = ['json', 'jsonl', 'csv', 'parquet']
+COMPRESSIONS = ['gzip', 'zstd']
+EXTENSIONS = {'.gz': 'gzip', '.zst': 'zstd'}
+
+# Private module classes.
+class _Writer(abc.ABC):
+
+    def __init__(self, path=None, compression=None):
+        if compression is None and path is not None:
+            compression = next((v for k, v in EXTENSIONS.items() if path.endswith(k)), None)
+
+        # Standard output is flushed but never closed.
+        self.path = path
+        raw = sys.stdout.buffer if path is None else open(path, 'wb')
+        self._closers = [] if path is None else [raw.close]
+        if compression == 'gzip':
+            raw = gzip.GzipFile(fileobj=raw, mode='wb')
+            self._closers.insert(0, raw.close)
+        elif compression == 'zstd':
+            if zstandard is None:
+                raise ImportError('zstd compression requires the zstandard package.')
+            raw = zstandard.ZstdCompressor().stream_writer(raw, closefd=False)
+            self._closers.insert(0, raw.close)
+        elif compression is not None:
+            raise ValueError('Unknown compression: {}.'.format(compression))
+        self.stream = io.TextIOWrapper(raw, encoding='utf-8', newline='')
+
+    def write_all(self, results):
+        for record in _records(results):
+            self.write(record)
+
+    @abc.abstractmethod
+    def write(self, record):
+        pass
+
+    def close(self):
+        self.stream.flush()
+        self.stream.detach()
+        for close in self._closers:
+            close()
+        if self.path is None:
+            sys.stdout.buffer.flush()
+
+
+class _JsonWriter(_Writer):
+
+    def __init__(self, path=None, compression=None):
+        super().__init__(path, compression)
+        self._count = 0
+
+    def write_all(self, results):
+        # Single objects (app details, a page of reviews) are written as is.
+        if isinstance(results, dict):
+            json.dump(results, self.stream)
+            self._count = None
+        else:
+            super().write_all(results)
+
+    def write(self, record):
+        self.stream.write(',\n' if self._count else '[')
+        json.dump(record, self.stream)
+        self._count += 1
+
+    def close(self):
+        if self._count is not None:
+            self.stream.write(']' if self._count else '[]')
+        self.stream.write('\n')
+        super().close()
+
+
+class _JsonlWriter(_Writer):
+
+    def write(self, record):
+        self.stream.write(json.dumps(record))
+        self.stream.write('\n')
+
+
+class _CsvWriter(_Writer):
+
+    def __init__(self, path=None, compression=None):
+        super().__init__(path, compression)
+        self._writer = None
+
+    def write(self, record):
+        if not isinstance(record, dict):
+            record = {'value': record}
+        # Columns are taken from the first record; nested values are JSON encoded.
+        if self._writer is None:
+            self._writer = csv.DictWriter(self.stream, fieldnames=record.keys(), extrasaction='ignore')
+            self._writer.writeheader()
+        self._writer.writerow({
+            k: json.dumps(v) if isinstance(v, (dict, list)) else v
+            for k, v in record.items()
+        })
+
+
+# Private module attributes.
+_writers = {'json': _JsonWriter, 'jsonl': _JsonlWriter, 'csv': _CsvWriter}
+
+# Public module methods.
+def write_results(results, path=None, format='json', compression=None, endpoint='app'):
+    """
+    Writes scraper results one record at a time, so that iterators of records
+    are never held in memory.
+
+    Parameters
+    ----------
+    results : dict, list or iterable
+        The results of a scraper call. A page of reviews is written as its list of reviews,
+        except in the json format where it is written as is.
+    path : str, optional
+        The output file (default is None, the standard output).
+    format : {'json', 'jsonl', 'csv', 'parquet'}, optional
+        The output format (default is 'json'). The parquet format requires `path` and the pyarrow package.
+    compression : {None, 'gzip', 'zstd'}, optional
+        The output compression (default is inferred from the .gz or .zst extension of `path`, and
+        zstd for parquet, where it is applied to each column chunk instead of the whole file).
+    endpoint : str, optional
+        The scraper function that returned the results, which selects the schema of parquet files
+        (default is 'app').
+    """
+    if format == 'parquet':
+        if path is None:
+            raise ValueError('The parquet format needs an output path.')
+        _export.write_parquet(_records(results), path, endpoint, compression or 'zstd')
+        return
+
+    writer = _writers[format](path, compression)
+    try:
+        writer.write_all(results)
+    finally:
+        writer.close()
+
+# Private module methods.
+def _records(results):
+    if isinstance(results, dict):
+        return results['data'] if isinstance(results.get('data'), list) else [results]
+    return results
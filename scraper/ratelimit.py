@@ -0,0 +1,79 @@
+import os
+import struct
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Private module classes.
+class _TokenBucket:
+
+    def __init__(self, rate, burst=1, path=None):
+        if rate <= 0 or burst < 1:
+            raise ValueError('Rate limits need a positive rate and a burst of at least 1.')
+        self.interval = 1.0 / rate
+        self.tolerance = (burst - 1) * self.interval
+        self.path = path
+        self._tat = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        # Generic cell rate algorithm: the bucket state is the theoretical
+        # arrival time of the next request, a single float that can be shared
+        # between processes through a locked file.
+        with self._lock:
+            if self.path is None or fcntl is None:
+                self._tat, wait = self._schedule(self._tat)
+                return wait
+            with open(self.path, 'a+b') as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                f.seek(0)
+                data = f.read(8)
+                tat, wait = self._schedule(struct.unpack('d', data)[0] if len(data) == 8 else 0.0)
+                f.seek(0)
+                f.truncate()
+                f.write(struct.pack('d', tat))
+                f.flush()
+                return wait
+
+    def _schedule(self, tat):
+        now = time.time()
+        tat = max(tat, now)
+        return tat + self.interval, max(0.0, tat - self.tolerance - now)
+
+
+class _RateLimiter:
+
+    def __init__(self):
+        self.buckets = {}
+
+    def configure(self, limits, path=None):
+        buckets = {}
+        for endpoint, limit in limits.items():
+            rate, burst = limit if isinstance(limit, (tuple, list)) else (limit, 1)
+            bucket_path = None
+            if path is not None:
+                os.makedirs(path, exist_ok=True)
+                name = 'all' if endpoint == '*' else endpoint
+                bucket_path = os.path.join(path, '{}.bucket'.format(name))
+            buckets[endpoint] = _TokenBucket(rate, burst, bucket_path)
+        self.buckets = buckets
+
+    @property
+    def shared(self):
+        # Buckets shared between processes lock a file, which may block.
+        return any(x.path is not None and fcntl is not None for x in self.buckets.values())
+
+    def reserve(self, endpoint):
+        # The '*' bucket applies to every call, on top of the endpoint's own bucket.
+        buckets = [self.buckets.get('*'), self.buckets.get(endpoint)]
+        return max([x.reserve() for x in buckets if x is not None], default=0.0)
+
+    def wait(self, endpoint):
+        delay = self.reserve(endpoint)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
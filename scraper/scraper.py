@@ -1,11 +1,19 @@
+import collections as _collections
+import concurrent.futures as _futures
+import datetime as _datetime
+import itertools as _itertools
+import os as _os
+
 import scraper.wrapper as _wrapper
+import scraper.state as _state
 import scraper.exceptions as _exceptions
+import scraper.locales as _locales
 
-# Public module attribues.
-collection = _wrapper.collection
-category = _wrapper.category
-age = _wrapper.age
-sort = _wrapper.sort
+# Public module attribues (collection, category, age and sort), loaded on first access.
+def __getattr__(name):
+    if name in _wrapper._Wrapper.constant_names:
+        return getattr(_wrapper, name)
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
 
 # Public module methods - wrappers around the original API.
 def app(appId, lang='en', country='us', **kwargs):
@@ -20,8 +28,23 @@ def app(appId, lang='en', country='us', **kwargs):
         The two letter language code in which to fetch the app page (default is 'en').
     country : str, optional
         The two letter country code used to retrieve the applications (default is 'us').
+    fields : list of str, optional
+        Names of the fields to return for each application (e.g. ['appId', 'score', 'version']). Other fields
+        are dropped by the Node worker before the result is serialized (default is None, all fields).
     throttle : int, optional
         Upper bound to the amount of requests that will be attempted per second (default is None).
+    timeout : float, optional
+        Number of seconds to wait for the Node worker to answer the request, or None for no limit (default is set with `configure`).
+    cache : bool, optional
+        If True, the response is read from and stored in the on-disk cache (default is set with `configure`).
+    memo : bool, optional
+        If True, the response is read from and stored in the in-memory memo (default is set with `configure`).
+    refresh : bool, optional
+        If True, a cached or memoized response is ignored and replaced by a fresh one (default is False).
+    retries : int, optional
+        Number of times a transient failure (network error, throttling, timeout) is retried (default is set with `configure`).
+    as_objects : bool, optional
+        If True, results are returned as compact `scraper.models` records instead of dicts (default is False).
     **kwargs : dict
         Keyword arguments.
 
@@ -34,6 +57,8 @@ def app(appId, lang='en', country='us', **kwargs):
     ------
     ScraperException
         Raised if an error occured when scraping Google Play Store or parsing the response.
+        Subclasses tell apart missing apps (NotFoundException), unparsable responses
+        (ParseException) and temporary failures (TransientException, RateLimitedException).
     """
     vargs = {
         'appId': appId,
@@ -63,8 +88,23 @@ def list(collection=None, category=None, age=None, num=500, lang='en', country='
         The two letter country code used to retrieve the applications (default is 'us').
     fullDetail : bool, optional
         If True, an extra request will be made for every resulting app to fetch its full detail (default is False).
+    fields : list of str, optional
+        Names of the fields to return for each application (e.g. ['appId', 'score', 'version']). Other fields
+        are dropped by the Node worker before the result is serialized (default is None, all fields).
     throttle : int, optional
         Upper bound to the amount of requests that will be attempted per second (default is None).
+    timeout : float, optional
+        Number of seconds to wait for the Node worker to answer the request, or None for no limit (default is set with `configure`).
+    cache : bool, optional
+        If True, the response is read from and stored in the on-disk cache (default is set with `configure`).
+    memo : bool, optional
+        If True, the response is read from and stored in the in-memory memo (default is set with `configure`).
+    refresh : bool, optional
+        If True, a cached or memoized response is ignored and replaced by a fresh one (default is False).
+    retries : int, optional
+        Number of times a transient failure (network error, throttling, timeout) is retried (default is set with `configure`).
+    as_objects : bool, optional
+        If True, results are returned as compact `scraper.models` records instead of dicts (default is False).
     **kwargs : dict
         Keyword arguments.
 
@@ -108,8 +148,23 @@ def search(term, num=20, lang='en', country='us', fullDetail=False, price='all',
         If True, an extra request will be made for every resulting app to fetch its full detail (default is False).
     price : {'all', 'free', 'paid'}, optional
         Allows to control if the results apps are free, paid or both (default is 'all').
+    fields : list of str, optional
+        Names of the fields to return for each application (e.g. ['appId', 'score', 'version']). Other fields
+        are dropped by the Node worker before the result is serialized (default is None, all fields).
     throttle : int, optional
         Upper bound to the amount of requests that will be attempted per second (default is None).
+    timeout : float, optional
+        Number of seconds to wait for the Node worker to answer the request, or None for no limit (default is set with `configure`).
+    cache : bool, optional
+        If True, the response is read from and stored in the on-disk cache (default is set with `configure`).
+    memo : bool, optional
+        If True, the response is read from and stored in the in-memory memo (default is set with `configure`).
+    refresh : bool, optional
+        If True, a cached or memoized response is ignored and replaced by a fresh one (default is False).
+    retries : int, optional
+        Number of times a transient failure (network error, throttling, timeout) is retried (default is set with `configure`).
+    as_objects : bool, optional
+        If True, results are returned as compact `scraper.models` records instead of dicts (default is False).
     **kwargs : dict
         Keyword arguments.
 
@@ -150,8 +205,23 @@ def developer(devId, lang='en', country='us', num=60, fullDetail=False, **kwargs
         The number of apps to retrieve (default is 60).
     fullDetail : bool, optional
         If True, an extra request will be made for every resulting app to fetch its full detail (default is False).
+    fields : list of str, optional
+        Names of the fields to return for each application (e.g. ['appId', 'score', 'version']). Other fields
+        are dropped by the Node worker before the result is serialized (default is None, all fields).
     throttle : int, optional
         Upper bound to the amount of requests that will be attempted per second (default is None).
+    timeout : float, optional
+        Number of seconds to wait for the Node worker to answer the request, or None for no limit (default is set with `configure`).
+    cache : bool, optional
+        If True, the response is read from and stored in the on-disk cache (default is set with `configure`).
+    memo : bool, optional
+        If True, the response is read from and stored in the in-memory memo (default is set with `configure`).
+    refresh : bool, optional
+        If True, a cached or memoized response is ignored and replaced by a fresh one (default is False).
+    retries : int, optional
+        Number of times a transient failure (network error, throttling, timeout) is retried (default is set with `configure`).
+    as_objects : bool, optional
+        If True, results are returned as compact `scraper.models` records instead of dicts (default is False).
     **kwargs : dict
         Keyword arguments.
 
@@ -189,6 +259,18 @@ def suggest(term, lang='en', country='us', **kwargs):
         The two letter country code used to retrieve the applications (default is 'us').
     throttle : int, optional
         Upper bound to the amount of requests that will be attempted per second (default is None).
+    timeout : float, optional
+        Number of seconds to wait for the Node worker to answer the request, or None for no limit (default is set with `configure`).
+    cache : bool, optional
+        If True, the response is read from and stored in the on-disk cache (default is set with `configure`).
+    memo : bool, optional
+        If True, the response is read from and stored in the in-memory memo (default is set with `configure`).
+    refresh : bool, optional
+        If True, a cached or memoized response is ignored and replaced by a fresh one (default is False).
+    retries : int, optional
+        Number of times a transient failure (network error, throttling, timeout) is retried (default is set with `configure`).
+    as_objects : bool, optional
+        If True, results are returned as compact `scraper.models` records instead of dicts (default is False).
     **kwargs : dict
         Keyword arguments.
 
@@ -232,6 +314,18 @@ def reviews(appId, lang='en', country='us', sort=None, num=100, paginate=False,
         The next token to paginate (default is None).
     throttle : int, optional
         Upper bound to the amount of requests that will be attempted per second (default is None).
+    timeout : float, optional
+        Number of seconds to wait for the Node worker to answer the request, or None for no limit (default is set with `configure`).
+    cache : bool, optional
+        If True, the response is read from and stored in the on-disk cache (default is set with `configure`).
+    memo : bool, optional
+        If True, the response is read from and stored in the in-memory memo (default is set with `configure`).
+    refresh : bool, optional
+        If True, a cached or memoized response is ignored and replaced by a fresh one (default is False).
+    retries : int, optional
+        Number of times a transient failure (network error, throttling, timeout) is retried (default is set with `configure`).
+    as_objects : bool, optional
+        If True, results are returned as compact `scraper.models` records instead of dicts (default is False).
     **kwargs : dict
         Keyword arguments.
 
@@ -257,6 +351,110 @@ def reviews(appId, lang='en', country='us', sort=None, num=100, paginate=False,
     }
     return _wrapper.reviews(**vargs)
 
+def iter_reviews(appId, lang='en', country='us', sort=None, nextPaginationToken=None, max_reviews=None, since=None, prefetch=True, **kwargs):
+    """
+    Lazily iterates over the reviews of an application, one review at a time.
+    Pages are only requested when the previous one has been consumed, so memory
+    use does not grow with the number of reviews.
+
+    Parameters
+    ----------
+    appId : str
+        The Google Play id of the application (the ?id= parameter on the url).
+    lang : str, optional
+        The two letter language code in which to fetch the app page (default is 'en').
+    country : str, optional
+        The two letter country code used to retrieve the applications (default is 'us').
+    sort : {scraper.sort['NEWEST'], scraper.sort['RATING'], scraper.sort['HELPFULNESS']}, optional
+        The way the reviews are going to be sorted (default is scraper.sort['NEWEST']).
+    nextPaginationToken : str, optional
+        Token of the page to start from, e.g. a token saved before a crash (default is None, the first page).
+    max_reviews : int, optional
+        Maximum number of reviews to yield (default is None, no limit).
+    since : datetime.datetime or str, optional
+        Stop at the first review older than this date; only meaningful when sorting by
+        scraper.sort['NEWEST']. Naive datetimes are interpreted as UTC (default is None).
+    prefetch : bool, optional
+        If True, the next page is requested in the background while the current one is consumed (default is True).
+    **kwargs : dict
+        Keyword arguments forwarded to `reviews` (e.g. throttle, timeout).
+
+    Returns
+    -------
+    iterator of dict
+        Iterator over the reviews. Its `nextPaginationToken` attribute is the token of the page
+        being read, from which the iteration can be resumed (reviews of that page are yielded
+        again), or None once every review has been read.
+
+    Raises
+    ------
+    ScraperException
+        Raised if an error occured when scraping Google Play Store or parsing the response.
+    """
+    vargs = {
+        'lang': lang,
+        'country': country,
+        'sort': sort,
+        'paginate': True,
+        **kwargs
+    }
+    fetch = lambda token: reviews(appId, nextPaginationToken=token, **vargs)
+    return _ReviewIterator(fetch, nextPaginationToken, max_reviews, since, prefetch)
+
+def sync_reviews(appId, lang='en', country='us', state_path=None, **kwargs):
+    """
+    Retrieves the reviews of an application posted since the previous sync.
+    Reviews are read newest first and paging stops at the last review seen by
+    the previous sync (the watermark), which is then moved to the newest review.
+
+    Parameters
+    ----------
+    appId : str
+        The Google Play id of the application (the ?id= parameter on the url).
+    lang : str, optional
+        The two letter language code in which to fetch the app page (default is 'en').
+    country : str, optional
+        The two letter country code used to retrieve the applications (default is 'us').
+    state_path : str, optional
+        Path of the SQLite file storing the watermarks
+        (default is ~/.cache/google-play-scraper-py/watermarks.sqlite3).
+    **kwargs : dict
+        Keyword arguments forwarded to `iter_reviews` (e.g. max_reviews for the first sync, throttle).
+
+    Returns
+    -------
+    list of dict
+        List of the new reviews, newest first. Empty if nothing was posted since the previous sync.
+
+    Raises
+    ------
+    ScraperException
+        Raised if an error occured when scraping Google Play Store or parsing the response.
+    """
+    if state_path is None:
+        state_path = _os.path.join(_wrapper.CACHE_DIR, 'watermarks.sqlite3')
+    watermarks = _state._watermarks(state_path)
+    watermark = watermarks.get(appId, lang, country)
+
+    vargs = {
+        'lang': lang,
+        'country': country,
+        'sort': _wrapper.sort['NEWEST'],
+        # The watermark is usually on the first page, so a prefetched page would be wasted.
+        'prefetch': False,
+        'since': None if watermark is None else watermark['date'],
+        **kwargs
+    }
+    new = []
+    for review in iter_reviews(appId, **vargs):
+        if watermark is not None and review['id'] == watermark['id']:
+            break
+        new.append(review)
+
+    if new:
+        watermarks.set(appId, lang, country, new[0])
+    return new
+
 def similar(appId, lang='en', country='us', fullDetail=False, **kwargs):
     """
     Returns a list of similar apps to the one specified.
@@ -271,8 +469,23 @@ def similar(appId, lang='en', country='us', fullDetail=False, **kwargs):
         The two letter country code used to retrieve the applications (default is 'us').
     fullDetail : bool, optional
         If True, an extra request will be made for every resulting app to fetch its full detail (default is False).
+    fields : list of str, optional
+        Names of the fields to return for each application (e.g. ['appId', 'score', 'version']). Other fields
+        are dropped by the Node worker before the result is serialized (default is None, all fields).
     throttle : int, optional
         Upper bound to the amount of requests that will be attempted per second (default is None).
+    timeout : float, optional
+        Number of seconds to wait for the Node worker to answer the request, or None for no limit (default is set with `configure`).
+    cache : bool, optional
+        If True, the response is read from and stored in the on-disk cache (default is set with `configure`).
+    memo : bool, optional
+        If True, the response is read from and stored in the in-memory memo (default is set with `configure`).
+    refresh : bool, optional
+        If True, a cached or memoized response is ignored and replaced by a fresh one (default is False).
+    retries : int, optional
+        Number of times a transient failure (network error, throttling, timeout) is retried (default is set with `configure`).
+    as_objects : bool, optional
+        If True, results are returned as compact `scraper.models` records instead of dicts (default is False).
     **kwargs : dict
         Keyword arguments.
 
@@ -309,6 +522,18 @@ def permissions(appId, lang='en', short=False, **kwargs):
         If True, the permission names will be returned instead of permission/description objects (default is False).
     throttle : int, optional
         Upper bound to the amount of requests that will be attempted per second (default is None).
+    timeout : float, optional
+        Number of seconds to wait for the Node worker to answer the request, or None for no limit (default is set with `configure`).
+    cache : bool, optional
+        If True, the response is read from and stored in the on-disk cache (default is set with `configure`).
+    memo : bool, optional
+        If True, the response is read from and stored in the in-memory memo (default is set with `configure`).
+    refresh : bool, optional
+        If True, a cached or memoized response is ignored and replaced by a fresh one (default is False).
+    retries : int, optional
+        Number of times a transient failure (network error, throttling, timeout) is retried (default is set with `configure`).
+    as_objects : bool, optional
+        If True, results are returned as compact `scraper.models` records instead of dicts (default is False).
     **kwargs : dict
         Keyword arguments.
 
@@ -343,6 +568,18 @@ def datasafety(appId, lang='en', **kwargs):
         The Google Play id of the application to get data safety information for.
     lang : str, optional
         The two letter language code in which to fetch the app page (default is 'en').
+    timeout : float, optional
+        Number of seconds to wait for the Node worker to answer the request, or None for no limit (default is set with `configure`).
+    cache : bool, optional
+        If True, the response is read from and stored in the on-disk cache (default is set with `configure`).
+    memo : bool, optional
+        If True, the response is read from and stored in the in-memory memo (default is set with `configure`).
+    refresh : bool, optional
+        If True, a cached or memoized response is ignored and replaced by a fresh one (default is False).
+    retries : int, optional
+        Number of times a transient failure (network error, throttling, timeout) is retried (default is set with `configure`).
+    as_objects : bool, optional
+        If True, results are returned as compact `scraper.models` records instead of dicts (default is False).
     **kwargs : dict
         Keyword arguments.
 
@@ -364,7 +601,130 @@ def datasafety(appId, lang='en', **kwargs):
     }
     return _wrapper.datasafety(**vargs)
 
+def app_many(appIds, concurrency=10, ordered=True, **kwargs):
+    """
+    Retrieves the full detail of many applications concurrently.
+
+    Parameters
+    ----------
+    appIds : iterable of str
+        The Google Play ids of the applications.
+    concurrency : int, optional
+        Maximum number of requests in flight at the same time (default is 10).
+    ordered : bool, optional
+        If True, results are yielded in the order of `appIds`, otherwise as soon as they complete (default is True).
+    **kwargs : dict
+        Keyword arguments forwarded to `app` (e.g. lang, country, throttle).
+
+    Yields
+    ------
+    tuple of (str, dict or ScraperException)
+        The application id and either its full details or the exception raised while scraping it.
+    """
+    return _map(lambda appId: app(appId, **kwargs), appIds, concurrency, ordered)
+
+def app_locales(appId, locales, concurrency=10, **kwargs):
+    """
+    Retrieves the full detail of an application in many locales concurrently, deduplicated.
+
+    Most locales return the same details apart from a few translated fields, so the
+    records are split into one shared base record and the fields that differ in each
+    distinct response (see `scraper.locales.split_locales`). The record of a locale is
+    rebuilt with `scraper.locales.join_locale(result, locale)`.
+
+    Parameters
+    ----------
+    appId : str
+        The Google Play id of the application.
+    locales : iterable of str or tuple of (str, str)
+        The locales, as 'lang-country' strings (e.g. 'de-de') or (lang, country) tuples.
+    concurrency : int, optional
+        Maximum number of requests in flight at the same time (default is 10).
+    **kwargs : dict
+        Keyword arguments forwarded to `app` (e.g. throttle, cache, fields), apart from
+        `as_objects`: the deltas are computed on the dicts of the responses.
+
+    Returns
+    -------
+    dict
+        Dictionary with the `appId`, the shared `base` record, the `deltas` by content hash,
+        the content hash of each of the `locales` ('lang-country'), and the `errors` message
+        of each locale that failed.
+
+    Raises
+    ------
+    ValueError
+        Raised if `as_objects` is set.
+    ScraperException
+        Raised if the application could not be retrieved in any locale.
+    """
+    if kwargs.pop('as_objects', False):
+        raise ValueError('app_locales only returns dicts, as_objects is not supported.')
+    locales = [tuple(x.split('-', 1)) if isinstance(x, str) else tuple(x) for x in locales]
+    fetch = lambda locale: app(appId, lang=locale[0], country=locale[1], **kwargs)
+    records, errors = {}, {}
+    for (lang, country), result in _map(fetch, locales, concurrency, False):
+        key = '{}-{}'.format(lang, country)
+        if isinstance(result, _exceptions.ScraperException):
+            errors[key] = result
+        else:
+            records[key] = result
+    if errors and not records:
+        raise next(iter(errors.values()))
+    return {
+        'appId': appId,
+        **_locales.split_locales(records),
+        'errors': {k: str(v) for k, v in errors.items()},
+    }
+
+def datasafety_many(appIds, concurrency=10, ordered=True, **kwargs):
+    """
+    Returns the data safety information of many applications concurrently.
+
+    Parameters
+    ----------
+    appIds : iterable of str
+        The Google Play ids of the applications.
+    concurrency : int, optional
+        Maximum number of requests in flight at the same time (default is 10).
+    ordered : bool, optional
+        If True, results are yielded in the order of `appIds`, otherwise as soon as they complete (default is True).
+    **kwargs : dict
+        Keyword arguments forwarded to `datasafety` (e.g. lang).
+
+    Yields
+    ------
+    tuple of (str, dict or ScraperException)
+        The application id and either its data safety information or the exception raised while scraping it.
+    """
+    return _map(lambda appId: datasafety(appId, **kwargs), appIds, concurrency, ordered)
+
+def batch(command, rows, concurrency=10, ordered=True, **kwargs):
+    """
+    Calls one of the scraper functions concurrently for many rows of parameters.
+
+    Parameters
+    ----------
+    command : str
+        Name of the scraper function to call (e.g. 'app', 'datasafety', 'reviews').
+    rows : iterable of dict
+        Keyword arguments of each call (e.g. [{'appId': 'com.example', 'lang': 'de'}]).
+    concurrency : int, optional
+        Maximum number of requests in flight at the same time (default is 10).
+    ordered : bool, optional
+        If True, results are yielded in the order of `rows`, otherwise as soon as they complete (default is True).
+    **kwargs : dict
+        Keyword arguments shared by every call; values in a row take precedence.
 
+    Yields
+    ------
+    tuple of (dict, object or ScraperException)
+        The row and either the result of the call or the exception raised by it.
+    """
+    if command not in _wrapper._Wrapper.api_keys:
+        raise ValueError('Unknown scraper function: {}.'.format(command))
+    fn = globals()[command]
+    return _map(lambda row: fn(**{**kwargs, **row}), rows, concurrency, ordered)
 
 def categories(**kwargs):
     """
@@ -372,6 +732,18 @@ def categories(**kwargs):
 
     Parameters
     ----------
+    timeout : float, optional
+        Number of seconds to wait for the Node worker to answer the request, or None for no limit (default is set with `configure`).
+    cache : bool, optional
+        If True, the response is read from and stored in the on-disk cache (default is set with `configure`).
+    memo : bool, optional
+        If True, the response is read from and stored in the in-memory memo (default is set with `configure`).
+    refresh : bool, optional
+        If True, a cached or memoized response is ignored and replaced by a fresh one (default is False).
+    retries : int, optional
+        Number of times a transient failure (network error, throttling, timeout) is retried (default is set with `configure`).
+    as_objects : bool, optional
+        If True, results are returned as compact `scraper.models` records instead of dicts (default is False).
     **kwargs : dict
         Keyword arguments.
 
@@ -386,3 +758,284 @@ def categories(**kwargs):
         Raised if an error occured when scraping Google Play Store or parsing the response.
     """
     return _wrapper.categories(**kwargs)
+
+def configure(timeout=None, workers=None, cache=None, cache_path=None, cache_size=None, cache_ttl=None, memo=None, memo_size=None, rate_limit=None, rate_limit_path=None, retries=None, backoff=None, max_backoff=None):
+    """
+    Configures the Node workers, the response cache, the memo, the rate limits and the retries shared by every call.
+
+    Parameters
+    ----------
+    timeout : float, optional
+        Default number of seconds to wait for an answer to each request (default is 300).
+    workers : int, optional
+        Number of Node processes requests are dispatched to (default is 1).
+    cache : bool, optional
+        If True, responses are cached on disk unless a call passes cache=False (default is False).
+    cache_path : str, optional
+        Path of the SQLite cache file (default is ~/.cache/google-play-scraper-py/responses.sqlite3).
+    cache_size : int, optional
+        Size cap of the cache in bytes, above which least recently used responses are evicted (default is 256 MiB).
+    cache_ttl : dict of {str: float}, optional
+        Number of seconds a response stays fresh in the cache and memo, by function name (e.g. {'app': 3600}).
+    memo : bool, optional
+        If True, responses are kept in an in-memory LRU memo unless a call passes memo=False (default is False).
+        Identical concurrent calls always share a single request, whether the memo is enabled or not.
+    memo_size : int, optional
+        Maximum number of responses kept in the memo (default is 1024).
+    rate_limit : float or dict, optional
+        Maximum number of requests per second sent to Google Play, enforced with token buckets
+        across every call of the process (default is None, no limit). Either a rate applying to
+        all calls, or a dictionary of rates or (rate, burst) tuples by function name, where the
+        '*' key applies to all calls (e.g. {'*': (10, 20), 'reviews': 2}). Cached responses are
+        not rate limited.
+    rate_limit_path : str, optional
+        Directory holding the token bucket state, to share the rate limits between every process
+        of the host that uses the same directory (default is None, limits apply per process).
+    retries : int, optional
+        Number of times a call is retried after a TransientException (default is 0). Other
+        failures, such as NotFoundException or ParseException, are never retried.
+    backoff : float, optional
+        Base delay in seconds of the exponential backoff between retries; the delay before the
+        n-th retry is drawn uniformly between 0 and backoff * 2 ** n (default is 1.0).
+    max_backoff : float, optional
+        Upper bound in seconds of the delay between retries (default is 60.0).
+    """
+    vargs = {
+        'timeout': timeout,
+        'workers': workers,
+        'cache': cache,
+        'cache_path': cache_path,
+        'cache_size': cache_size,
+        'cache_ttl': cache_ttl,
+        'memo': memo,
+        'memo_size': memo_size,
+        'rate_limit': rate_limit,
+        'rate_limit_path': rate_limit_path,
+        'retries': retries,
+        'backoff': backoff,
+        'max_backoff': max_backoff
+    }
+    _wrapper.configure(**vargs)
+
+def cache_info():
+    """
+    Returns statistics about the on-disk response cache.
+
+    Returns
+    -------
+    dict
+        Dictionary with the number of cache `hits` and `misses` of this process, and the number of
+        `entries`, total `size` and `max_size` in bytes of the cache file.
+    """
+    return _wrapper.cache_info()
+
+def cache_clear():
+    """
+    Removes every response from the on-disk cache and resets the hit/miss counters.
+    """
+    _wrapper.cache_clear()
+
+def memo_info():
+    """
+    Returns statistics about the in-memory memo.
+
+    Returns
+    -------
+    dict
+        Dictionary with the number of memo `hits` and `misses`, the number of calls `coalesced` into an
+        identical request already in flight, and the number of `entries` and `max_size` of the memo.
+    """
+    return _wrapper.memo_info()
+
+def memo_clear():
+    """
+    Removes every response from the in-memory memo and resets its counters.
+    """
+    _wrapper.memo_clear()
+
+def metrics_info():
+    """
+    Returns the metrics recorded by every call of this process, by function name.
+
+    Returns
+    -------
+    dict
+        Dictionary mapping function names to their `calls`, `errors`, `retries`, `cache_hits`,
+        `memo_hits`, `bytes_sent` and `bytes_received` to the Node workers, and `timings`: latency
+        histograms (`count`, `sum`, `max`, `p50`, `p99` and `buckets`, in seconds) of the whole
+        `call`, of the `request` to the Node worker, of the `node` function itself and of the
+        `decode` of its response. Worker start times are recorded under 'worker', and
+        lookups of the Node module constants under 'constants'.
+    """
+    return _wrapper.metrics_info()
+
+def metrics_clear():
+    """
+    Resets every recorded metric.
+    """
+    _wrapper.metrics_clear()
+
+def metrics_export(format='prometheus'):
+    """
+    Returns the recorded metrics as text.
+
+    Parameters
+    ----------
+    format : {'prometheus', 'summary'}, optional
+        Either the Prometheus text exposition format, to be served to a scraper or written to a
+        node_exporter textfile, or a human readable summary table (default is 'prometheus').
+
+    Returns
+    -------
+    str
+        The metrics.
+    """
+    return _wrapper.metrics_export(format)
+
+def add_metrics_hook(hook):
+    """
+    Registers a function called with every recorded metric, e.g. to forward them to StatsD
+    with `scraper.metrics.StatsdHook`.
+
+    Parameters
+    ----------
+    hook : callable
+        Called as hook(kind, endpoint, name, value), where kind is 'count' (value is an integer)
+        or 'timing' (value is a number of seconds). Exceptions raised by the hook are ignored.
+    """
+    _wrapper.add_metrics_hook(hook)
+
+def remove_metrics_hook(hook):
+    """
+    Unregisters a function added with `add_metrics_hook`.
+    """
+    _wrapper.remove_metrics_hook(hook)
+
+def check_modules():
+    """
+    Checks whether the google-play-scraper Node module can be loaded.
+
+    Returns
+    -------
+    bool
+        True if the Node module is installed, False otherwise.
+
+    Raises
+    ------
+    ScraperException
+        Raised if Node.js failed for any other reason than a missing module.
+    """
+    return _wrapper.check_modules()
+
+def update_modules():
+    """
+    Updates the google-play-scraper Node module from the npm registry.
+    The Node module is installed automatically on first use if it is missing,
+    but it is only ever updated by this function.
+
+    Returns
+    -------
+    str
+        Version of the installed google-play-scraper Node module.
+
+    Raises
+    ------
+    ScraperException
+        Raised if npm failed to update the module.
+    """
+    return _wrapper.update_modules()
+
+# Private module methods.
+def _map(fn, items, concurrency, ordered):
+    def call(item):
+        try:
+            return fn(item)
+        except _exceptions.ScraperException as e:
+            return e
+
+    # Keep at most `concurrency` requests in flight so that arbitrarily large
+    # (or lazy) inputs are never materialized at once.
+    items = iter(items)
+    with _futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+        submit = lambda item: (item, executor.submit(call, item))
+        if ordered:
+            pending = _collections.deque(map(submit, _itertools.islice(items, concurrency)))
+            while pending:
+                item, future = pending.popleft()
+                yield item, future.result()
+                pending.extend(map(submit, _itertools.islice(items, 1)))
+        else:
+            pending = {f: item for item, f in map(submit, _itertools.islice(items, concurrency))}
+            while pending:
+                done, _ = _futures.wait(pending, return_when=_futures.FIRST_COMPLETED)
+                for future in done:
+                    yield pending.pop(future), future.result()
+                    pending.update({f: item for item, f in map(submit, _itertools.islice(items, 1))})
+
+def _parse_date(date):
+    if isinstance(date, str):
+        date = _datetime.datetime.fromisoformat(date.replace('Z', '+00:00'))
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=_datetime.timezone.utc)
+    return date
+
+# Private module classes.
+class _ReviewIterator:
+
+    def __init__(self, fetch, token, max_reviews, since, prefetch):
+        self.nextPaginationToken = token
+        self._fetch = fetch
+        self._remaining = max_reviews
+        self._since = None if since is None else _parse_date(since)
+        self._executor = _futures.ThreadPoolExecutor(max_workers=1) if prefetch else None
+        self._page = _collections.deque()
+        self._next_token = token
+        self._next_page = None
+        self._has_next = True
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        # The budget is checked first, so that no page is requested once it is spent.
+        if self._remaining is not None and self._remaining <= 0:
+            self._stop()
+        while not self._page:
+            if not self._has_next:
+                self._stop()
+            self._load_page()
+
+        if self._remaining is not None:
+            self._remaining -= 1
+        review = self._page.popleft()
+        if self._since is not None and _parse_date(review['date']) < self._since:
+            self._stop()
+        return review
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def _load_page(self):
+        token = self._next_token
+        if self._next_page is not None:
+            result = self._next_page.result()
+        else:
+            result = self._fetch(token)
+        self.nextPaginationToken = token
+        self._page.extend(result['data'])
+        self._next_token = result.get('nextPaginationToken')
+        self._has_next = self._next_token is not None
+        self._next_page = None
+
+        # Only prefetch when the consumer may actually need the next page.
+        wanted = self._remaining is None or self._remaining > len(self._page)
+        if self._has_next and wanted and self._executor is not None:
+            self._next_page = self._executor.submit(self._fetch, self._next_token)
+
+    def _stop(self):
+        self.close()
+        if not self._has_next and not self._page:
+            self.nextPaginationToken = None
+        raise StopIteration
@@ -0,0 +1,227 @@
+import http.server
+import json
+import logging
+import os
+import socketserver
+import urllib.parse
+
+import scraper.scraper as _scraper
+import scraper.wrapper as _wrapper
+from .exceptions import (
+    ScraperException, NotFoundException, ParseException, TransientException, RateLimitedException)
+
+logger = logging.getLogger('__main__')
+
+# Functions served on top of the google-play-scraper ones; iter_reviews is streamed.
+FUNCTIONS = sorted([*_wrapper._Wrapper.api_keys, 'iter_reviews', 'sync_reviews', 'app_locales'])
+STREAMED = ['iter_reviews']
+
+# Arguments always read as strings from a query string.
+STRING_ARGS = ['appId', 'devId', 'term', 'nextPaginationToken', 'since']
+
+# Number of streamed records sent in one chunk, unless a new page starts first.
+CHUNK_SIZE = 256
+
+# HTTP status of each failure, most specific first.
+_STATUSES = [
+    (NotFoundException, 404),
+    (RateLimitedException, 429),
+    (TransientException, 503),
+    (ParseException, 502),
+    (ScraperException, 500),
+]
+
+# Private module classes.
+class _Handler(http.server.BaseHTTPRequestHandler):
+    """
+    Serves GET /<function>?<arguments> and POST /<function> with a JSON object
+    of arguments, and answers with the JSON result. Query string values are
+    parsed as JSON when they can be (e.g. num=100, fullDetail=true), and
+    `fields` and `locales` also accept comma separated lists.
+    """
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self._handle()
+
+    def do_POST(self):
+        self._handle()
+
+    def address_string(self):
+        # Unix socket clients have no address.
+        return self.client_address[0] if isinstance(self.client_address, tuple) else 'unix'
+
+    def log_message(self, format, *args):
+        logger.debug('{} - {}'.format(self.address_string(), format % args))
+
+    def _handle(self):
+        url = urllib.parse.urlsplit(self.path)
+        name = url.path.strip('/')
+        try:
+            if name in ['', 'health']:
+                return self._send(200, {'status': 'ok', 'functions': FUNCTIONS})
+            if name == 'metrics':
+                return self._send(200, _scraper.metrics_export('prometheus'), 'text/plain; version=0.0.4')
+            if name not in FUNCTIONS:
+                return self._send(404, _error('NotFound', 'Unknown function: {}.'.format(name)))
+            kwargs = self._get_kwargs(url.query)
+        except ValueError as e:
+            return self._send(400, _error('BadRequest', str(e)))
+
+        fn = getattr(_scraper, name)
+        if name in STREAMED:
+            return self._stream(fn, kwargs)
+        try:
+            result = fn(**kwargs)
+        except Exception as e:
+            return self._send(*_get_error(e))
+        self._send(200, result)
+
+    def _get_kwargs(self, query):
+        kwargs = {}
+        for k, values in urllib.parse.parse_qs(query).items():
+            value = values[-1]
+            if k in ['fields', 'locales']:
+                value = value.split(',')
+            elif k not in STRING_ARGS:
+                try:
+                    value = json.loads(value)
+                except ValueError:
+                    pass
+            kwargs[k] = value
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            body = json.loads(self.rfile.read(length))
+            if not isinstance(body, dict):
+                raise ValueError('The request body must be a JSON object of arguments.')
+            kwargs.update(body)
+        # Python objects cannot be sent back as JSON, and clients never choose server side files.
+        kwargs.pop('as_objects', None)
+        kwargs.pop('state_path', None)
+        return kwargs
+
+    def _send(self, status, body, content_type='application/json'):
+        data = (body if isinstance(body, str) else _dumps(body)).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _stream(self, fn, kwargs):
+        # Records are sent as newline delimited JSON in chunks, one page of reviews at a time
+        # at most, so that a client reads the first reviews while the next pages are fetched.
+        try:
+            records = fn(**kwargs)
+        except Exception as e:
+            return self._send(*_get_error(e))
+        try:
+            first = next(records, None)
+        except Exception as e:
+            records.close()
+            return self._send(*_get_error(e))
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        lines, token = [], records.nextPaginationToken
+        try:
+            try:
+                record = first
+                while record is not None:
+                    lines.append(_dumps(record))
+                    record = next(records, None)
+                    if len(lines) >= CHUNK_SIZE or records.nextPaginationToken != token or record is None:
+                        self._write_chunk(lines)
+                        lines, token = [], records.nextPaginationToken
+            except (BrokenPipeError, ConnectionResetError):
+                raise
+            except Exception as e:
+                # The status is already sent, so a failure is the last line of the stream.
+                self._write_chunk(lines + [_dumps(_get_error(e)[1])])
+            self.wfile.write(b'0\r\n\r\n')
+        except (BrokenPipeError, ConnectionResetError):
+            logger.debug('Client of {} disconnected.'.format(self.path))
+            self.close_connection = True
+        finally:
+            records.close()
+
+    def _write_chunk(self, lines):
+        if lines:
+            data = ('\n'.join(lines) + '\n').encode()
+            self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+
+    daemon_threads = True
+
+
+# Public module methods.
+def make_server(host='127.0.0.1', port=8080, socket_path=None):
+    """
+    Creates the HTTP server exposing the scraper functions, without starting it.
+
+    Every request is served on its own thread, through the Node workers, cache,
+    memo and rate limits of the process (see `scraper.configure`).
+
+    Parameters
+    ----------
+    host : str, optional
+        The address to listen on (default is '127.0.0.1').
+    port : int, optional
+        The TCP port to listen on (default is 8080).
+    socket_path : str, optional
+        Path of a Unix socket to listen on instead of a TCP port (default is None).
+
+    Returns
+    -------
+    socketserver.BaseServer
+        The server; call its `serve_forever` method to start it.
+    """
+    if socket_path is not None:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        return _UnixHTTPServer(socket_path, _Handler)
+    server = http.server.ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    return server
+
+def serve(host='127.0.0.1', port=8080, socket_path=None):
+    """
+    Serves the scraper functions over HTTP until interrupted. See `make_server`.
+    """
+    server = make_server(host, port, socket_path)
+    # Start a Node worker before the first client has to wait for it.
+    _wrapper._wrapper._execute_var('sort')
+    logger.info('Serving on {}.'.format(socket_path or 'http://{}:{}'.format(host, port)))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if socket_path is not None and os.path.exists(socket_path):
+            os.remove(socket_path)
+
+# Private module methods.
+def _get_error(e):
+    # Status and body of the response to a failed call.
+    if isinstance(e, ScraperException):
+        status = next(status for cls, status in _STATUSES if isinstance(e, cls))
+        return status, _error(type(e).__name__, str(e), e)
+    if isinstance(e, (TypeError, ValueError)):
+        return 400, _error('BadRequest', str(e))
+    logger.exception('Unexpected error while serving a request.')
+    return 500, _error(type(e).__name__, str(e))
+
+def _error(type, message, e=None):
+    error = {'type': type, 'message': message}
+    if e is not None:
+        error.update({'status': e.status, 'code': e.code})
+    return {'error': error}
+
+def _dumps(value):
+    return json.dumps(value, default=str, ensure_ascii=False)
@@ -0,0 +1,268 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+import scraper.scraper as _scraper
+from .exceptions import ScraperException
+
+# Fields whose change means the application itself was updated.
+VERSION_FIELDS = ('updated', 'version')
+
+# Public module classes.
+class SnapshotStore:
+    """
+    Local store of the latest record of each application, with the history of
+    its changes, for periodic re-scrapes of `app`, `datasafety`, `permissions`
+    or any other function returning one record per application.
+
+    Each record is content hashed: an unchanged record only updates the time it
+    was last checked, and a changed one replaces the stored record and appends a
+    field-level delta (the old and new value of each changed field) to an indexed
+    change log, which answers "what changed since T" without diffing copies.
+
+    Parameters
+    ----------
+    path : str
+        Path of the SQLite file, created if missing.
+    ignore : list of str, optional
+        Fields left out of hashes and deltas, e.g. fields that change on every scrape such as
+        `comments` (default is None). The stored record keeps the value of its last change.
+
+    Examples
+    --------
+    >>> with SnapshotStore('snapshots.sqlite3') as store:
+    ...     for appId, change in store.refresh('app', appIds, concurrency=20):
+    ...         if change is not None and change['moved']:
+    ...             fetch_reviews(appId)
+    ...     store.changed_since(time.time() - 86400)
+    """
+
+    schema = (
+        "CREATE TABLE IF NOT EXISTS snapshots ("
+        "kind TEXT, app_id TEXT, locale TEXT, hash TEXT, record BLOB,"
+        "first_seen REAL, checked REAL, changed REAL,"
+        "PRIMARY KEY (kind, app_id, locale));"
+        "CREATE TABLE IF NOT EXISTS changes ("
+        "id INTEGER PRIMARY KEY, kind TEXT, app_id TEXT, locale TEXT,"
+        "time REAL, hash TEXT, moved INTEGER, delta BLOB);"
+        "CREATE INDEX IF NOT EXISTS changes_time ON changes (time);"
+        "CREATE INDEX IF NOT EXISTS changes_app ON changes (app_id, time);"
+    )
+
+    def __init__(self, path, ignore=None):
+        self.path = path
+        self.ignore = set(ignore or [])
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def put(self, kind, appId, record, locale='', at=None):
+        """
+        Stores a record if it changed since the last one stored for the application.
+
+        Parameters
+        ----------
+        kind : str
+            The function that returned the record (e.g. 'app', 'datasafety').
+        appId : str
+            The Google Play id of the application.
+        record : dict or list
+            The record.
+        locale : str, optional
+            The locale of the record, for applications scraped in several ones (default is '').
+        at : float, optional
+            Timestamp of the scrape (default is now).
+
+        Returns
+        -------
+        dict or None
+            None if the record did not change, otherwise the change: its `kind`, `appId`, `locale`,
+            `time`, `hash`, whether the record is `new`, whether the application `moved` (a new record,
+            or a change of its `updated` or `version` field), and the `delta` of each changed field as
+            an [old, new] pair.
+        """
+        at = time.time() if at is None else at
+        fields = self._fields(record)
+        digest = hashlib.sha1(_encode(fields).encode()).hexdigest()
+        with self._lock:
+            db = self._connect()
+            row = db.execute(
+                'SELECT hash, record FROM snapshots WHERE kind = ? AND app_id = ? AND locale = ?',
+                (kind, appId, locale)).fetchone()
+            if row is not None and row[0] == digest:
+                db.execute(
+                    'UPDATE snapshots SET checked = ? WHERE kind = ? AND app_id = ? AND locale = ?',
+                    (at, kind, appId, locale))
+                db.commit()
+                return None
+
+            old = {} if row is None else self._fields(json.loads(zlib.decompress(row[1])))
+            delta = {
+                k: [old.get(k), fields.get(k)]
+                for k in sorted(set(old) | set(fields))
+                if _encode(old.get(k)) != _encode(fields.get(k))
+            }
+            moved = row is None or any(k in delta for k in VERSION_FIELDS)
+            blob = zlib.compress(_encode(record).encode())
+            db.execute(
+                'INSERT INTO snapshots VALUES (?, ?, ?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT (kind, app_id, locale) DO UPDATE SET '
+                'hash = excluded.hash, record = excluded.record, '
+                'checked = excluded.checked, changed = excluded.changed',
+                (kind, appId, locale, digest, blob, at, at, at))
+            db.execute(
+                'INSERT INTO changes (kind, app_id, locale, time, hash, moved, delta) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (kind, appId, locale, at, digest, int(moved), zlib.compress(_encode(delta).encode())))
+            db.commit()
+        return {
+            'kind': kind, 'appId': appId, 'locale': locale, 'time': at, 'hash': digest,
+            'new': row is None, 'moved': moved, 'delta': delta,
+        }
+
+    def get(self, kind, appId, locale=''):
+        """
+        Returns the latest stored record of an application, or None if it was never stored.
+        """
+        with self._lock:
+            row = self._connect().execute(
+                'SELECT record FROM snapshots WHERE kind = ? AND app_id = ? AND locale = ?',
+                (kind, appId, locale)).fetchone()
+        return None if row is None else json.loads(zlib.decompress(row[0]))
+
+    def changes(self, since=0, kind=None, appId=None):
+        """
+        Returns the changes stored since a given time, oldest first.
+
+        Parameters
+        ----------
+        since : float or datetime.datetime, optional
+            Only changes at or after this time are returned (default is 0, every change).
+        kind : str, optional
+            Only changes of records returned by this function are returned (default is None, all).
+        appId : str, optional
+            Only changes of this application are returned (default is None, all).
+
+        Returns
+        -------
+        list of dict
+            The changes, as returned by `put`.
+        """
+        query, args = self._filter(since, kind, appId)
+        with self._lock:
+            rows = self._connect().execute(
+                'SELECT kind, app_id, locale, time, hash, moved, delta, '
+                'id = (SELECT MIN(id) FROM changes AS c WHERE c.kind = changes.kind '
+                'AND c.app_id = changes.app_id AND c.locale = changes.locale) '
+                'FROM changes WHERE ' + query + ' ORDER BY id', args).fetchall()
+        return [{
+            'kind': row[0], 'appId': row[1], 'locale': row[2], 'time': row[3], 'hash': row[4],
+            'new': bool(row[7]), 'moved': bool(row[5]), 'delta': json.loads(zlib.decompress(row[6])),
+        } for row in rows]
+
+    def changed_since(self, since, kind=None, moved=False):
+        """
+        Returns the ids of the applications whose records changed since a given time.
+
+        Parameters
+        ----------
+        since : float or datetime.datetime
+            Only changes at or after this time are considered.
+        kind : str, optional
+            Only records returned by this function are considered (default is None, all).
+        moved : bool, optional
+            If True, only applications that were updated (new `updated` or `version`) are returned
+            (default is False).
+
+        Returns
+        -------
+        list of str
+            The application ids, in the order of their first change.
+        """
+        query, args = self._filter(since, kind, None)
+        if moved:
+            query += ' AND moved = 1'
+        with self._lock:
+            rows = self._connect().execute(
+                'SELECT app_id FROM changes WHERE ' + query + ' GROUP BY app_id ORDER BY MIN(id)',
+                args).fetchall()
+        return [row[0] for row in rows]
+
+    def refresh(self, kind, appIds, concurrency=10, ordered=False, **kwargs):
+        """
+        Scrapes applications again and stores the records that changed.
+
+        Parameters
+        ----------
+        kind : str
+            Name of the scraper function to call (e.g. 'app', 'datasafety', 'permissions').
+        appIds : iterable of str
+            The Google Play ids of the applications.
+        concurrency : int, optional
+            Maximum number of requests in flight at the same time (default is 10).
+        ordered : bool, optional
+            If True, results are yielded in the order of `appIds` (default is False).
+        **kwargs : dict
+            Keyword arguments passed to every call (e.g. lang, country, throttle).
+
+        Yields
+        ------
+        tuple of (str, dict or None or ScraperException)
+            The application id and either its change, None if it did not change, or the
+            exception raised while scraping it.
+        """
+        locale = '-'.join(kwargs[k] for k in ['lang', 'country'] if k in kwargs)
+        rows = ({'appId': x} for x in appIds)
+        for row, result in _scraper.batch(kind, rows, concurrency, ordered, **kwargs):
+            if isinstance(result, ScraperException):
+                yield row['appId'], result
+                continue
+            yield row['appId'], self.put(kind, row['appId'], result, locale)
+
+    def close(self):
+        """
+        Closes the SQLite connection.
+        """
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _fields(self, record):
+        # Lists (e.g. permissions) are compared as a single field.
+        if not isinstance(record, dict):
+            return {'value': record}
+        return {k: v for k, v in record.items() if k not in self.ignore}
+
+    def _filter(self, since, kind, appId):
+        since = since.timestamp() if hasattr(since, 'timestamp') else since
+        query, args = 'time >= ?', [since]
+        if kind is not None:
+            query, args = query + ' AND kind = ?', args + [kind]
+        if appId is not None:
+            query, args = query + ' AND app_id = ?', args + [appId]
+        return query, args
+
+    def _connect(self):
+        if self._connection is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._connection = sqlite3.connect(
+                self.path, timeout=30, check_same_thread=False)
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute('PRAGMA synchronous=NORMAL')
+            self._connection.executescript(self.schema)
+        return self._connection
+
+
+# Private module methods.
+def _encode(value):
+    return json.dumps(value, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
@@ -0,0 +1,60 @@
+import os
+import sqlite3
+import threading
+import time
+
+# Private module classes.
+class _WatermarkStore:
+
+    schema = (
+        "CREATE TABLE IF NOT EXISTS watermarks ("
+        "app_id TEXT, lang TEXT, country TEXT, review_id TEXT, date TEXT,"
+        "updated REAL, PRIMARY KEY (app_id, lang, country));"
+    )
+
+    def __init__(self, path):
+        self.path = path
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def get(self, appId, lang, country):
+        with self._lock:
+            row = self._connect().execute(
+                'SELECT review_id, date FROM watermarks '
+                'WHERE app_id = ? AND lang = ? AND country = ?',
+                (appId, lang, country)).fetchone()
+        return None if row is None else {'id': row[0], 'date': row[1]}
+
+    def set(self, appId, lang, country, review):
+        with self._lock:
+            db = self._connect()
+            db.execute(
+                'INSERT OR REPLACE INTO watermarks VALUES (?, ?, ?, ?, ?, ?)',
+                (appId, lang, country, review['id'], review['date'], time.time()))
+            db.commit()
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def _connect(self):
+        if self._connection is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._connection = sqlite3.connect(
+                self.path, timeout=30, check_same_thread=False)
+            self._connection.executescript(self.schema)
+        return self._connection
+
+
+# Private module attributes.
+_stores = {}
+_stores_lock = threading.Lock()
+
+# Private module methods.
+def _watermarks(path):
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = _WatermarkStore(path)
+        return _stores[path]
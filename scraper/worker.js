@@ -0,0 +1,87 @@
+// Long-lived worker answering line-delimited JSON-RPC requests on stdin with
+// the functions and constants of the google-play-scraper module.
+//
+// Usage: node worker.js <module directory> [--memoized] [--chunk <records>] [--check]
+//
+// Each request is {jsonrpc, id, method, params}, where method is a function or
+// a constant of the module, and params are passed to the function as is. The
+// `fields` option of params is applied here, before the result is serialized.
+// List results longer than --chunk records (and the data list of a page of
+// reviews) are written as {id, partial} lines ahead of the response itself.
+
+'use strict';
+
+const readline = require('readline');
+
+const argv = process.argv.slice(2);
+const option = (name) => argv.indexOf(name) !== -1;
+const chunk = option('--chunk') ? parseInt(argv[argv.indexOf('--chunk') + 1], 10) : 100;
+
+let gplay = require(argv[0]);
+if (option('--check')) {
+  process.exit(0);
+}
+if (option('--memoized')) {
+  gplay = gplay.memoized();
+}
+
+function reply (message) {
+  process.stdout.write(JSON.stringify(message) + '\n');
+}
+
+function send (id, result, elapsed) {
+  const items = Array.isArray(result) ? result : (result && Array.isArray(result.data) ? result.data : null);
+  if (items && items.length > chunk) {
+    for (let i = 0; i < items.length; i += chunk) {
+      reply({ jsonrpc: '2.0', id: id, partial: items.slice(i, i + chunk) });
+    }
+    result = items === result ? [] : Object.assign({}, result, { data: [] });
+  }
+  reply({ jsonrpc: '2.0', id: id, elapsed: elapsed, result: result });
+}
+
+function project (result, fields) {
+  const pick = (x) => {
+    if (!x || typeof x !== 'object') {
+      return x;
+    }
+    const y = {};
+    fields.forEach((k) => { if (k in x) { y[k] = x[k]; } });
+    return y;
+  };
+  return Array.isArray(result) ? result.map(pick) : pick(result);
+}
+
+readline.createInterface({ input: process.stdin }).on('line', (line) => {
+  const req = JSON.parse(line);
+  const start = Date.now();
+  const fields = req.params && req.params.fields;
+  let params = req.params;
+  if (fields) {
+    params = Object.assign({}, params);
+    delete params.fields;
+  }
+
+  Promise.resolve().then(() => {
+    const x = gplay[req.method];
+    return typeof x === 'function' ? x(params) : x;
+  }).then((result) => {
+    send(req.id, fields ? project(result, fields) : result, Date.now() - start);
+  }).catch((e) => {
+    e = e || {};
+    reply({
+      jsonrpc: '2.0',
+      id: req.id,
+      elapsed: Date.now() - start,
+      error: {
+        message: String(e.message || e),
+        name: e.name,
+        code: e.code,
+        status: e.status || (e.response && e.response.statusCode)
+      }
+    });
+  });
+});
+
+// Announces that the module is loaded, for the startup time metrics.
+reply({ jsonrpc: '2.0', method: 'ready' });
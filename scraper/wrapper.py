@@ -1,37 +1,276 @@
 import subprocess
+import collections
+import itertools
+import threading
+import builtins
+import random
+import time
+import atexit
 import json
 import os
 import logging
 
-from .exceptions import ScraperException
+from .cache import _Cache, _Memo
+from .decoder import CHUNK_SIZE, _Assembler
+from .metrics import _Metrics, _record_request
+from .models import _convert
+from .ratelimit import _RateLimiter
+from .exceptions import ScraperException, TransientException, _from_error
 
 SELF_DIR = os.path.dirname(os.path.abspath(__file__))
-NODE_DIR = os.path.join(SELF_DIR, 'node_modules', 'google-play-scraper')
+# Can point to another build of the Node module (e.g. the stub used by the benchmarks).
+NODE_DIR = os.path.abspath(os.environ.get(
+    'SCRAPER_NODE_DIR', os.path.join(SELF_DIR, 'node_modules', 'google-play-scraper')))
+WORKER_SCRIPT = os.path.join(SELF_DIR, 'worker.js')
+CACHE_DIR = os.path.join(
+    os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache')),
+    'google-play-scraper-py')
 logger = logging.getLogger('__main__')
 
-# Private module class.
-class _Wrapper:
+# Default number of seconds to wait for an answer of the Node worker, so that a hung
+# request never blocks its caller forever (large fullDetail lists can take minutes).
+DEFAULT_TIMEOUT = 300.0
+
+# Private module classes.
+class _Worker:
+
+    def __init__(self, args, metrics=None):
+        self.args = args
+        self.metrics = metrics
+        self._process = None
+        self._pending = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+
+    def call(self, method, params=None, timeout=None):
+        request = _Request()
+        start = time.perf_counter()
+        with self._lock:
+            request_id = next(self._ids)
+            message = json.dumps({
+                'jsonrpc': '2.0',
+                'id': request_id,
+                'method': method,
+                'params': params
+            })
+            logger.debug('Sending request: {}'.format(message))
+            line = message.encode() + b'\n'
+            self._send(request_id, request, line)
+
+        if not request.done.wait(timeout):
+            with self._lock:
+                self._pending.pop(request_id, None)
+            raise TransientException(
+                'Request {} timed out after {} seconds.'.format(method, timeout), code='ETIMEDOUT')
+        if self.metrics is not None:
+            # Constant lookups are not scraper functions, and are recorded together.
+            name = method if method in _Wrapper.api_keys else 'constants'
+            _record_request(
+                self.metrics, name, len(line), time.perf_counter() - start,
+                request.response, request.stats)
+        if 'error' in request.response:
+            raise _from_error(request.response['error'])
+        return request.response.get('result')
+
+    @property
+    def load(self):
+        return len(self._pending)
+
+    def stop(self):
+        with self._lock:
+            process, self._process = self._process, None
+        if process is not None and process.poll() is None:
+            process.stdin.close()
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    def _send(self, request_id, request, line):
+        # Restart the worker once if it crashed since the previous request.
+        for attempt in range(2):
+            if self._process is None or self._process.poll() is not None:
+                self._start()
+            self._pending[request_id] = request
+            try:
+                self._process.stdin.write(line)
+                self._process.stdin.flush()
+                return
+            except (BrokenPipeError, OSError):
+                self._pending.pop(request_id, None)
+                self._process = None
+        raise TransientException('Unable to send request to the Node worker.', code='EPIPE')
+
+    def _start(self):
+        logger.debug('Starting Node worker.')
+        process = subprocess.Popen(
+            self.args,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE)
+        stderr = collections.deque(maxlen=20)
+        self._process, self._pending = process, {}
+        threading.Thread(
+            target=self._read_stdout,
+            args=(process, self._pending, stderr, time.perf_counter()),
+            daemon=True).start()
+        threading.Thread(
+            target=lambda: stderr.extend(process.stderr),
+            daemon=True).start()
+
+    def _read_stdout(self, process, pending, stderr, started):
+        assembler = _Assembler()
+        for line in process.stdout:
+            response = assembler.feed(line)
+            if response is None:
+                continue
+            # The worker announces when the Node module is loaded.
+            if response.get('method') == 'ready' and self.metrics is not None:
+                self.metrics.observe('worker', 'startup', time.perf_counter() - started)
+            with self._lock:
+                request = pending.pop(response.get('id'), None)
+            if request is not None:
+                request.set(response, assembler.stats)
+            elif 'id' in response:
+                # The caller timed out and its request was dropped.
+                logger.debug('Dropped the late response to request {}.'.format(response['id']))
+
+        # The worker exited; fail every request still waiting on it.
+        code = process.wait()
+        message = 'Node worker exited with code {}: {}'.format(
+            code, b''.join(stderr).decode(errors='replace'))
+        with self._lock:
+            if self._process is process:
+                self._process = None
+            requests = builtins.list(pending.values())
+            pending.clear()
+        for request in requests:
+            request.set({'error': {'message': message, 'code': 'EWORKER'}})
+
+
+class _WorkerPool:
+
+    def __init__(self, args, size=1, metrics=None):
+        self.args = args
+        self.metrics = metrics
+        self.workers = [_Worker(args, metrics) for _ in range(size)]
+
+    def call(self, method, params=None, timeout=None):
+        # Workers are started lazily, so idle slots only cost a process once
+        # every running worker already has requests in flight.
+        worker = min(self.workers, key=lambda x: x.load)
+        return worker.call(method, params, timeout=timeout)
+
+    def resize(self, size):
+        if size < 1:
+            raise ValueError('The worker pool needs at least one worker.')
+        self.workers, extra = self.workers[:size], self.workers[size:]
+        self.workers += [_Worker(self.args, self.metrics) for _ in range(size - len(self.workers))]
+        for worker in extra:
+            worker.stop()
+
+    def stop(self):
+        for worker in self.workers:
+            worker.stop()
+
+
+class _Request:
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.response = None
+        self.stats = (0, 0.0)
+
+    def set(self, response, stats=(0, 0.0)):
+        self.response = response
+        self.stats = stats
+        self.done.set()
 
-    node_dir = [x if x != '' else os.path.sep for x in NODE_DIR.split(os.path.sep)]
-    require_dir = "'{}'".format("', '".join(node_dir))
 
-    init_script = "var gplay = require(path.join({}));"
-    api_script = (
-        "var gplay = require(path.join({})){};"
-        "gplay.{}({{{}}})"
-        ".then(JSON.stringify).then(console.log).catch(console.log);"
-    )
-    var_script = (
-        "var gplay = require(path.join({})){};"
-        "let x = gplay.{};"
-        "console.log(JSON.stringify(x));"
-    )
+class _Wrapper:
 
-    def __init__(self, memoization=False):
-        self.memoization = '.memoized()' if memoization else ''
+    # Requests are sent as JSON lines to a bundled entry script, never as generated source.
+    worker_args = ['node', WORKER_SCRIPT, NODE_DIR, '--chunk', str(CHUNK_SIZE)]
+
+    # Arguments forwarded to each function of the Node module. The `fields`
+    # projection is applied by the worker before the result is serialized.
+    api_keys = {
+        'app': ['appId', 'lang', 'country', 'fields'],
+        'list': [
+            'collection', 'category', 'age', 'num',
+            'lang', 'country', 'fullDetail', 'fields'
+        ],
+        'search': [
+            'term', 'num', 'lang',
+            'country', 'fullDetail', 'price', 'fields'
+        ],
+        'developer': ['devId', 'lang', 'country', 'num', 'fullDetail', 'fields'],
+        'suggest': ['term', 'lang', 'country'],
+        'reviews': [
+            'appId', 'lang', 'country', 'sort',
+            'num', 'paginate', 'nextPaginationToken'
+        ],
+        'similar': ['appId', 'lang', 'country', 'fullDetail', 'fields'],
+        'permissions': ['appId', 'lang', 'short'],
+        'datasafety': ['appId', 'lang'],
+        'categories': [],
+    }
+
+    # Constant enums of the Node module, cached on disk per module version.
+    constant_names = ['collection', 'category', 'age', 'sort']
+
+    def __init__(self, memoization=False, timeout=DEFAULT_TIMEOUT, workers=1):
+        self.memoization = ['--memoized'] if memoization else []
+        self.timeout = timeout
+        self.constants = None
+        self.modules_installed = False
+        self._install_lock = threading.Lock()
+        self.cache_enabled = False
+        self.cache = _Cache(os.path.join(CACHE_DIR, 'responses.sqlite3'))
+        self.memo_enabled = False
+        self.memo = _Memo(ttl=self.cache.ttl)
+        self.rate_limiter = _RateLimiter()
+        self.metrics = _Metrics()
+        self.retries = 0
+        self.backoff = 1.0
+        self.max_backoff = 60.0
+        self.pool = _WorkerPool(self.worker_args + self.memoization, workers, self.metrics)
+        atexit.register(self.pool.stop)
+
+    def configure(self, timeout=None, workers=None, cache=None, cache_path=None,
+                  cache_size=None, cache_ttl=None, memo=None, memo_size=None,
+                  rate_limit=None, rate_limit_path=None, retries=None,
+                  backoff=None, max_backoff=None):
+        if timeout is not None:
+            self.timeout = timeout
+        if workers is not None:
+            self.pool.resize(workers)
+        if cache is not None:
+            self.cache_enabled = cache
+        if cache_path is not None:
+            self.cache.close()
+            self.cache = _Cache(cache_path, self.cache.max_size, self.cache.ttl)
+            self.memo.ttl = self.cache.ttl
+        if cache_size is not None:
+            self.cache.max_size = cache_size
+        if cache_ttl is not None:
+            self.cache.ttl.update(cache_ttl)
+        if memo is not None:
+            self.memo_enabled = memo
+        if memo_size is not None:
+            self.memo.max_size = memo_size
+        if rate_limit is not None:
+            limits = rate_limit if isinstance(rate_limit, dict) else {'*': rate_limit}
+            self.rate_limiter.configure(limits, rate_limit_path)
+        if retries is not None:
+            self.retries = retries
+        if backoff is not None:
+            self.backoff = backoff
+        if max_backoff is not None:
+            self.max_backoff = max_backoff
 
     def check_modules(self):
-        args = ['node', '-e', self.init_script.format(self.require_dir)]
+        args = self.worker_args + ['--check']
         try:
             subprocess.run(args, capture_output=True, check=True)
         except subprocess.CalledProcessError as e:
@@ -43,135 +282,249 @@ class _Wrapper:
 
     def update_modules(self):
         install_args = ['npm', '--prefix', SELF_DIR, 'update']
-        return subprocess.run(install_args, capture_output=True, check=True)
-
-    def set_vars(self, vars=[]):
-        for var in vars:
-            setattr(_Wrapper, var, self._execute_var(var))
-
-    def _execute_api(self, fn_name, keys, **kwargs):
-        cmd = self._get_args(keys, **kwargs)
-        script = self.api_script.format(
-            self.require_dir, self.memoization, fn_name, cmd)
-        return self._execute(script)
-
-    def _execute_var(self, var_name):
-        script = self.var_script.format(
-            self.require_dir, self.memoization, var_name)
-        return self._execute(script)
-
-    def _execute(self, script):
-        logger.debug('Executing script: {}'.format(script))
-        args = ['node', '-e', script]
         try:
-            process = subprocess.run(args, capture_output=True, check=True)
+            subprocess.run(install_args, capture_output=True, check=True)
         except subprocess.CalledProcessError as e:
-            stderr = e.stderr.decode()
-            raise ScraperException(stderr) from None
-        stdout = process.stdout.decode()
+            raise ScraperException(e.stderr.decode()) from None
+        # Reload the updated modules (and their constants) on the next request.
+        self.pool.stop()
+        self.constants = None
+        self.modules_installed = True
+        return self.installed_version()
+
+    def ensure_modules(self):
+        # Only install the Node module when it is missing, so that the
+        # registry is never contacted once the package is set up.
+        if self.modules_installed:
+            return
+        # Concurrent first calls must not run npm in the same directory at once.
+        with self._install_lock:
+            if self.modules_installed:
+                return
+            if self.installed_version() is None:
+                logger.info('Installing Node modules in {}.'.format(SELF_DIR))
+                self.update_modules()
+            self.modules_installed = True
+
+    def installed_version(self):
         try:
-            return json.loads(stdout)
-        except json.decoder.JSONDecodeError:
-            raise ScraperException(stdout) from None
+            with open(os.path.join(NODE_DIR, 'package.json')) as f:
+                return json.load(f).get('version')
+        except (OSError, ValueError):
+            return None
+
+    def get_constants(self):
+        if self.constants is None:
+            self.constants = self._load_constants()
+        return self.constants
+
+    def _load_constants(self):
+        self.ensure_modules()
+        constants = self._read_constants()
+        if constants is None:
+            constants = {x: self._execute_var(x) for x in self.constant_names}
+            self._write_constants(constants)
+        return constants
+
+    def _read_constants(self):
+        try:
+            with open(self._get_constants_path()) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
 
-    def _get_args(self, keys, **kwargs):
-        def stringify(x):
-            if x is None:
-                return 'null'
-            if isinstance(x, str):
-                return "'{}'".format(x)
-            elif type(x) == bool:
-                return '{}'.format(str(x).lower())
-            return '{}'.format(x)
+    def _write_constants(self, constants):
+        path = self._get_constants_path()
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            with open(path + '.tmp', 'w') as f:
+                json.dump(constants, f)
+            os.replace(path + '.tmp', path)
+        except OSError as e:
+            logger.debug('Unable to cache constants: {}'.format(e))
+
+    def _get_constants_path(self):
+        return os.path.join(CACHE_DIR, 'constants-{}.json'.format(self.installed_version()))
+
+    def _execute_api(self, fn_name, **kwargs):
+        start = time.perf_counter()
+        self.ensure_modules()
+        options = self._get_options(kwargs)
+        params = self._get_args(self.api_keys[fn_name], **kwargs)
+        key = self.cache.key(fn_name, params)
+        fetched = []
+        def fetch():
+            fetched.append(key)
+            return self._fetch(fn_name, params, key, options)
+        try:
+            output = self.memo.call(
+                key, fn_name, fetch, options['memo'], options['refresh'])
+        except Exception:
+            self.metrics.count(fn_name, 'errors')
+            raise
+        finally:
+            self.metrics.count(fn_name, 'calls')
+            self.metrics.observe(fn_name, 'call', time.perf_counter() - start)
+        if not fetched:
+            # Answered by the memo, or by an identical call already in flight.
+            self.metrics.count(fn_name, 'memo_hits')
+        return _convert(fn_name, output) if options['as_objects'] else output
+
+    def _fetch(self, fn_name, params, key, options):
+        use_cache = options['cache'] and not options['refresh']
+        output = self.cache.get(key) if use_cache else None
+        if output is not None:
+            self.metrics.count(fn_name, 'cache_hits')
+        else:
+            output = self._request(fn_name, params, options)
+            if options['cache']:
+                self.cache.set(key, fn_name, output)
+        return output
+
+    def _request(self, fn_name, params, options):
+        # Only transient failures (network, throttling, timeouts) are retried.
+        for attempt in itertools.count():
+            self.rate_limiter.wait(fn_name)
+            try:
+                return self.pool.call(fn_name, params, timeout=options['timeout'])
+            except TransientException as e:
+                if attempt >= options['retries']:
+                    raise
+                delay = self._get_backoff(attempt)
+                logger.debug('Retrying {} in {:.2f} seconds: {}'.format(fn_name, delay, e))
+                self.metrics.count(fn_name, 'retries')
+                time.sleep(delay)
+
+    def _get_backoff(self, attempt):
+        # Exponential backoff with full jitter.
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
 
-        args = ', '.join(["{}: {}".format(k, stringify(v))
-                          for k, v in kwargs.items() if k in keys + ['throttle']])
-        return args
+    def _execute_var(self, var_name):
+        self.ensure_modules()
+        return self.pool.call(var_name, timeout=self.timeout)
+
+    def _get_options(self, kwargs):
+        # Options handled on the Python side, never forwarded to Node.
+        return {
+            'timeout': kwargs.pop('timeout', self.timeout),
+            'cache': kwargs.pop('cache', self.cache_enabled),
+            'memo': kwargs.pop('memo', self.memo_enabled),
+            'refresh': kwargs.pop('refresh', False),
+            'retries': kwargs.pop('retries', self.retries),
+            'as_objects': kwargs.pop('as_objects', False),
+        }
+
+    def _get_args(self, keys, **kwargs):
+        return {k: v for k, v in kwargs.items() if k in keys + ['throttle']}
 
 
 # Private module attributes.
 _wrapper = _Wrapper()
-_wrapper.update_modules()
 
-# Set wrapper fields.
-_wrapper.set_vars(vars=['collection', 'category', 'age', 'sort'])
-
-# Public module attributes.
-collection = _wrapper.collection
-category = _wrapper.category
-age = _wrapper.age
-sort = _wrapper.sort
+# Public module attributes (collection, category, age and sort), loaded on first access.
+def __getattr__(name):
+    if name in _Wrapper.constant_names:
+        return _wrapper.get_constants()[name]
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
 
 # Public module methods.
+def configure(**kwargs):
+    _wrapper.configure(**kwargs)
+
+
+def cache_info():
+    return _wrapper.cache.info()
+
+
+def cache_clear():
+    return _wrapper.cache.clear()
+
+
+def memo_info():
+    return _wrapper.memo.info()
+
+
+def memo_clear():
+    return _wrapper.memo.clear()
+
+
+def metrics_info():
+    return _wrapper.metrics.info()
+
+
+def metrics_clear():
+    return _wrapper.metrics.clear()
+
+
+def metrics_export(format='prometheus'):
+    if format == 'prometheus':
+        return _wrapper.metrics.prometheus()
+    if format == 'summary':
+        return _wrapper.metrics.summary()
+    raise ValueError('Unknown metrics format: {}.'.format(format))
+
+
+def add_metrics_hook(hook):
+    _wrapper.metrics.hooks.append(hook)
+
+
+def remove_metrics_hook(hook):
+    _wrapper.metrics.hooks.remove(hook)
+
+
+def check_modules():
+    return _wrapper.check_modules()
+
+
+def update_modules():
+    return _wrapper.update_modules()
+
+
 def app(appId, **kwargs):
-    keys = ['appId', 'lang', 'country']
-    output = _wrapper._execute_api('app', keys, **{'appId': appId, **kwargs})
+    output = _wrapper._execute_api('app', **{'appId': appId, **kwargs})
     return output
 
 
 def list(**kwargs):
-    keys = [
-        'collection', 'category', 'age', 'num',
-        'lang', 'country', 'fullDetail'
-    ]
-    output = _wrapper._execute_api('list', keys, **kwargs)
+    output = _wrapper._execute_api('list', **kwargs)
     return output
 
 
 def search(term, **kwargs):
-    keys = [
-        'term', 'num', 'lang',
-        'country', 'fullDetail', 'price'
-    ]
-    output = _wrapper._execute_api('search', keys,  **{'term': term, **kwargs})
+    output = _wrapper._execute_api('search', **{'term': term, **kwargs})
     return output
 
 
 def developer(devId, **kwargs):
-    keys = ['devId', 'lang', 'country', 'num', 'fullDetail']
-    output = _wrapper._execute_api(
-        'developer', keys,  **{'devId': devId, **kwargs})
+    output = _wrapper._execute_api('developer', **{'devId': devId, **kwargs})
     return output
 
 
 def suggest(term, **kwargs):
-    keys = ['term', 'lang', 'country']
-    output = _wrapper._execute_api(
-        'suggest', keys,  **{'term': term, **kwargs})
+    output = _wrapper._execute_api('suggest', **{'term': term, **kwargs})
     return output
 
 
 def reviews(appId, **kwargs):
-    keys = [
-        'appId', 'lang', 'country', 'sort',
-        'num', 'paginate', 'nextPaginationToken'
-    ]
-    output = _wrapper._execute_api(
-        'reviews', keys,  **{'appId': appId, **kwargs})
+    output = _wrapper._execute_api('reviews', **{'appId': appId, **kwargs})
     return output
 
 
 def similar(appId, **kwargs):
-    keys = ['appId', 'lang', 'country', 'fullDetail']
-    output = _wrapper._execute_api(
-        'similar', keys,  **{'appId': appId, **kwargs})
+    output = _wrapper._execute_api('similar', **{'appId': appId, **kwargs})
     return output
 
 
 def permissions(appId, **kwargs):
-    keys = ['appId', 'lang', 'short']
-    output = _wrapper._execute_api(
-        'permissions', keys,  **{'appId': appId, **kwargs})
+    output = _wrapper._execute_api('permissions', **{'appId': appId, **kwargs})
     return output
 
 
 def datasafety(appId, **kwargs):
-    keys = ['appId', 'lang']
-    output = _wrapper._execute_api(
-        'datasafety', keys,  **{'appId': appId, **kwargs})
+    output = _wrapper._execute_api('datasafety', **{'appId': appId, **kwargs})
     return output
 
 
 def categories(**kwargs):
-    output = _wrapper._execute_api('categories', [],  **kwargs)
+    output = _wrapper._execute_api('categories', **kwargs)
     return output
@@ -26,6 +26,12 @@ setup(
     ],
     packages=find_packages(),
     include_package_data=True,
+    extras_require={
+        'zstd': ['zstandard'],
+        'parquet': ['pyarrow'],
+        'fast': ['orjson'],
+        'redis': ['redis'],
+    },
     entry_points={
         'console_scripts': [
             'scraper=scraper.__main__:main',